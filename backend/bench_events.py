@@ -0,0 +1,168 @@
+"""Fan visitor events out to many Server-Sent Events subscribers.
+
+Seeds a small throwaway database, starts the API under uvicorn, opens
+``--subscribers`` concurrent GET /api/visitors/events streams for one
+building (1000 by default) and then checks visitors in through the API.
+Every subscriber records when each "created" event reaches it, and the
+script prints delivery latency percentiles, how many events were delivered
+or lost, and the server's memory with all subscribers attached:
+
+    python bench_events.py --subscribers 1000 --events 50
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import timedelta
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+import requests
+
+from auth import create_access_token
+from bench_json import wait_until_ready
+from generate_data import generate
+from loadtest import ROOT_DIR, percentile
+
+
+def server_rss_mb(pid: int) -> float:
+    # Linux only; 0 elsewhere
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+async def subscribe(port: int, path: str, token: str, received: dict, ready: list):
+    # HTTP/1.0 so the stream is not chunked and frames can be read line by line
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.0\r\nAuthorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"retry:"):
+                ready.append(1)
+            elif line.startswith(b"data:"):
+                visitor_id = json.loads(line[5:])["id"]
+                received.setdefault(visitor_id, []).append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+def check_in(base_url: str, headers: dict, company: dict, number: int) -> str:
+    response = requests.post(f"{base_url}/api/visitors", headers=headers, timeout=30, json={
+        "fullName": f"Visitante {number}", "hostName": "Anfitrião", "reason": "Reunião",
+        "companyId": company["id"], "buildingId": company["buildingId"]
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def run(args, port: int, pid: int, data: dict) -> dict:
+    token = create_access_token({"sub": "bench", "role": "super_admin"}, timedelta(hours=1))
+    headers = {"Authorization": f"Bearer {token}"}
+    base_url = f"http://127.0.0.1:{port}"
+    company = data["companies"][0]
+    path = "/api/visitors/events?" + urlencode({"building_id": company["buildingId"]})
+
+    rss_idle = server_rss_mb(pid)
+    received, ready = {}, []
+    started = time.perf_counter()
+    subscribers = [
+        asyncio.ensure_future(subscribe(port, path, token, received, ready))
+        for _ in range(args.subscribers)
+    ]
+    while len(ready) < args.subscribers and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.05)
+    connect_seconds = time.perf_counter() - started
+    rss_connected = server_rss_mb(pid)
+
+    loop = asyncio.get_running_loop()
+    sent = {}
+    for number in range(args.events):
+        before = time.perf_counter()
+        visitor_id = await loop.run_in_executor(None, check_in, base_url, headers, company, number)
+        sent[visitor_id] = before
+        await asyncio.sleep(args.interval)
+    # Give the last events time to arrive
+    await asyncio.sleep(2)
+    for subscriber in subscribers:
+        subscriber.cancel()
+    await asyncio.gather(*subscribers, return_exceptions=True)
+
+    latencies = sorted(
+        arrival - sent[visitor_id]
+        for visitor_id, arrivals in received.items() if visitor_id in sent
+        for arrival in arrivals
+    )
+    expected = len(ready) * len(sent)
+    return {
+        "subscribers": len(ready),
+        "connectSeconds": round(connect_seconds, 2),
+        "events": len(sent),
+        "deliveries": len(latencies),
+        "lost": expected - len(latencies),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 1),
+        "maxMs": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "serverRssMbIdle": rss_idle,
+        "serverRssMbConnected": rss_connected
+    }
+
+
+async def seed(args) -> dict:
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    data = await generate(client[args.db_name], 1, 5, 1000, 30, seed=args.seed)
+    client.close()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE fan-out to many subscribers")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_bench_events")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between check-ins")
+    parser.add_argument("--port", type=int, default=8096)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Each subscriber is a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.subscribers * 2 + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    data = asyncio.run(seed(args))
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": args.db_name,
+           # Queues big enough that the benchmark measures latency, not drops
+           "VISITOR_EVENTS_QUEUE_SIZE": str(max(args.events, 100))}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--log-level", "warning",
+         "--backlog", str(args.subscribers * 2)],
+        cwd=ROOT_DIR, env=env
+    )
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.port}")
+        result = asyncio.run(run(args, args.port, server.pid, data))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
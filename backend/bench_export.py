@@ -0,0 +1,98 @@
+"""Benchmark visitor history exports on a large building.
+
+Seeds a throwaway database in which one building holds 1M visitors, then
+exports that building's full history as CSV, gzipped CSV and Parquet. Each
+format runs in a fresh process so its peak RSS is measured on its own.
+Rows per second, output size and peak memory are printed for every format;
+peak memory should stay flat however many rows are exported:
+
+    python bench_export.py --visitors 1000000
+    python bench_export.py --skip-seed --formats parquet
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from exports import export_query, export_visitors
+from generate_data import generate
+from loadtest import ROOT_DIR
+
+FORMATS = {"csv": ("csv", False), "csv.gz": ("csv", True), "parquet": ("parquet", False)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def export_once(args, name: str) -> dict:
+    fmt, compress = FORMATS[name]
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    building = (await db.buildings.find_one({}, {"_id": 0, "id": 1}))["id"]
+    rows = await db.visitors.count_documents({"buildingId": building})
+
+    rss_before = peak_rss_mb()
+    written = 0
+    started = time.perf_counter()
+    # Bytes are counted and dropped, as a client download would consume them
+    async for chunk in export_visitors(db, export_query(building, None, None), fmt, compress):
+        written += len(chunk)
+    elapsed = time.perf_counter() - started
+    client.close()
+    return {
+        "format": name,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rowsPerSecond": round(rows / elapsed) if elapsed else 0,
+        "megabytes": round(written / 1024 / 1024, 1),
+        "rssMbBefore": rss_before,
+        "peakRssMb": peak_rss_mb()
+    }
+
+
+async def seed(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    started = time.perf_counter()
+    # A single building with one company, so every visitor lands in the export
+    await generate(client[args.db_name], 1, 1, args.visitors, args.days, seed=args.seed)
+    print(f"Seeded {args.visitors} visitors in {time.perf_counter() - started:.1f}s")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV/Parquet visitor exports")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_bench_export")
+    parser.add_argument("--visitors", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from the previous run")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--run", choices=list(FORMATS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(asyncio.run(export_once(args, args.run))))
+        return
+
+    if not args.skip_seed:
+        asyncio.run(seed(args))
+    results = []
+    for name in args.formats.split(","):
+        output = subprocess.check_output(
+            [sys.executable, __file__, "--mongo-url", args.mongo_url, "--db-name", args.db_name, "--run", name],
+            cwd=ROOT_DIR, text=True
+        )
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark the image ingestion pipeline on phone-sized photos.
+
+Generates synthetic camera images (12 MP JPEGs with an EXIF orientation by
+default), pushes them through images.ingest_image on the cpu pool from
+concurrent callers, the way simultaneous kiosk check-ins do, and prints
+per-image latency percentiles plus the bytes stored per visitor (selfie and
+document photo, master and thumbnail) against what used to be stored:
+
+    python bench_images.py --images 40 --concurrency 8
+    IMAGE_FORMAT=JPEG IMAGE_QUALITY=75 python bench_images.py
+"""
+from PIL import Image, ImageDraw, ImageFilter
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import time
+
+import images
+from loadtest import percentile
+from workers import cpu_pool
+
+EXIF_ORIENTATION = 0x0112
+
+
+def phone_photo(rng: random.Random, width: int, height: int, quality: int) -> bytes:
+    # Smooth shapes plus sensor-like noise compress about as well as a real photo
+    image = Image.new("RGB", (width, height), tuple(rng.randint(0, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randint(0, width), rng.randint(0, height)
+        radius = rng.randint(width // 20, width // 4)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    image = image.filter(ImageFilter.GaussianBlur(width // 200))
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, noise, 0.12)
+
+    exif = Image.Exif()
+    # Phones store portrait shots sideways and rotate through EXIF
+    exif[EXIF_ORIENTATION] = 6
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+async def ingest_all(photos: list, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    stored = []
+
+    async def one(photo: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            # Requests carry base64; decoding it is part of the request cost
+            master, thumbnail, _ = await images.ingest_image(base64.b64decode(base64.b64encode(photo)))
+            latencies.append(time.perf_counter() - started)
+            stored.append(len(master) + len(thumbnail))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(photo) for photo in photos))
+    return latencies, stored, time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    photos = [phone_photo(rng, args.width, args.height, args.source_quality) for _ in range(args.images)]
+    # Start the worker processes before timing anything
+    await ingest_all(photos[:cpu_pool.max_workers], cpu_pool.max_workers)
+    latencies, stored, elapsed = await ingest_all(photos, args.concurrency)
+    latencies.sort()
+
+    original = sum(len(base64.b64encode(photo)) for photo in photos) / len(photos)
+    per_image = sum(stored) / len(stored)
+    return {
+        "format": images.IMAGE_FORMAT,
+        "quality": images.IMAGE_QUALITY,
+        "thumbnailQuality": images.IMAGE_THUMBNAIL_QUALITY,
+        "maxDimension": images.IMAGE_MAX_DIMENSION,
+        "source": f"{args.width}x{args.height}",
+        "images": len(photos),
+        "concurrency": args.concurrency,
+        "workers": cpu_pool.max_workers,
+        "imagesPerSecond": round(len(photos) / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 1),
+        # A visitor has a selfie and a document photo
+        "storedBytesPerVisitorBefore": round(original * 2),
+        "storedBytesPerVisitorAfter": round(per_image * 2),
+        "reduction": f"{1 - per_image / original:.1%}"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image downscaling and recompression")
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="simultaneous uploads")
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--source-quality", type=int, default=92, help="JPEG quality of the generated photos")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        cpu_pool.shutdown()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare GET /api/visitors throughput with and without FAST_JSON.
+
+Starts the API twice under uvicorn against the database in .env, once per
+mode, and hammers the visitor listing from a pool of client threads:
+
+    python bench_json.py --limit 1000 --seconds 20 --concurrency 16
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import timedelta
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import requests
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from auth import create_access_token
+
+
+def wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"API at {base_url} did not become healthy")
+
+
+def hammer(url: str, headers: dict, seconds: float) -> tuple:
+    session = requests.Session()
+    count = 0
+    response_bytes = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        response = session.get(url, headers=headers)
+        response.raise_for_status()
+        count += 1
+        response_bytes += len(response.content)
+    return count, response_bytes
+
+
+def run_mode(fast_json: bool, args, headers: dict) -> dict:
+    env = {**os.environ, "FAST_JSON": "1" if fast_json else "0"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url)
+        url = f"{base_url}/api/visitors?limit={args.limit}"
+        # Warm caches and connection pools before measuring
+        hammer(url, headers, 1)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            results = list(executor.map(lambda _: hammer(url, headers, args.seconds), range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    requests_done = sum(count for count, _ in results)
+    return {
+        "fastJson": fast_json,
+        "requests": requests_done,
+        "requestsPerSecond": round(requests_done / elapsed, 1),
+        "avgResponseBytes": sum(size for _, size in results) // max(requests_done, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark visitor listing serialization")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench", "role": "super_admin"}, timedelta(hours=1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    baseline = run_mode(False, args, headers)
+    fast = run_mode(True, args, headers)
+    print(json.dumps({
+        "limit": args.limit,
+        "concurrency": args.concurrency,
+        "baseline": baseline,
+        "fastJson": fast,
+        "speedup": round(fast["requestsPerSecond"] / baseline["requestsPerSecond"], 2) if baseline["requestsPerSecond"] else None
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
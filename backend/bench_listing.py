@@ -0,0 +1,101 @@
+"""Measure what image projections save on visitor list endpoints.
+
+Seeds a throwaway database, gives the visitors of one building inline base64
+images the way the kiosk used to store them, and then lists that building
+twice: with the old ``{"_id": 0}`` projection validated as ``Visitor``, and
+with the summary projection validated as ``VisitorSummary``. Bytes read from
+Mongo, response bytes, query time and validation plus serialization time
+are printed for both:
+
+    python bench_listing.py --visitors 20000 --limit 1000 --image-kb 300
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pydantic import TypeAdapter
+from typing import List
+import argparse
+import asyncio
+import base64
+import bson
+import json
+import os
+import time
+
+from generate_data import generate
+from models import Visitor, VisitorSummary
+from pagination import KEYSET_SORT
+from routes.visitors import VISITOR_SUMMARY_FIELDS
+
+RAW = CodecOptions(document_class=RawBSONDocument)
+
+
+async def add_inline_images(db, building: str, image_kb: int) -> int:
+    image = base64.b64encode(os.urandom(image_kb * 1024 * 3 // 4)).decode()
+    result = await db.visitors.update_many({"buildingId": building},
+                                           {"$set": {"documentImage": image, "selfie": image}})
+    return result.modified_count
+
+
+async def measure(db, building: str, projection: dict, model, limit: int, rounds: int) -> dict:
+    adapter = TypeAdapter(List[model])
+    raw_collection = db.visitors.with_options(codec_options=RAW)
+    query_seconds = serialize_seconds = 0.0
+    wire_bytes = response_bytes = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        raw = await raw_collection.find({"buildingId": building}, projection).sort(KEYSET_SORT) \
+            .limit(limit).to_list(limit)
+        query_seconds += time.perf_counter() - started
+        wire_bytes = sum(len(document.raw) for document in raw)
+
+        documents = [bson.decode(document.raw) for document in raw]
+        started = time.perf_counter()
+        # What FastAPI does with response_model: validate, then dump to JSON
+        body = adapter.dump_json(adapter.validate_python(documents))
+        serialize_seconds += time.perf_counter() - started
+        response_bytes = len(body)
+    return {
+        "documents": len(documents),
+        "mongoBytes": wire_bytes,
+        "responseBytes": response_bytes,
+        "queryMs": round(query_seconds / rounds * 1000, 2),
+        "serializeMs": round(serialize_seconds / rounds * 1000, 2)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark visitor list payloads with and without images")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_bench_listing")
+    parser.add_argument("--buildings", type=int, default=5)
+    parser.add_argument("--companies", type=int, default=10, help="companies per building")
+    parser.add_argument("--visitors", type=int, default=20000)
+    parser.add_argument("--image-kb", type=int, default=300, help="size of each inline base64 image")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    db = client[args.db_name]
+    data = await generate(db, args.buildings, args.companies, args.visitors, seed=args.seed)
+    building = data["buildings"][0]["id"]
+    with_images = await add_inline_images(db, building, args.image_kb)
+
+    before = await measure(db, building, {"_id": 0}, Visitor, args.limit, args.rounds)
+    after = await measure(db, building, VISITOR_SUMMARY_FIELDS, VisitorSummary, args.limit, args.rounds)
+    client.close()
+    print(json.dumps({
+        "visitorsWithImages": with_images,
+        "limit": args.limit,
+        "before": before,
+        "after": after,
+        "mongoBytesSaved": f"{1 - after['mongoBytes'] / before['mongoBytes']:.1%}" if before["mongoBytes"] else None,
+        "responseBytesSaved": f"{1 - after['responseBytes'] / before['responseBytes']:.1%}" if before["responseBytes"] else None
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
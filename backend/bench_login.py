@@ -0,0 +1,121 @@
+"""Check that a burst of logins does not slow down the rest of the API.
+
+Seeds a throwaway database, starts the API under uvicorn and runs the
+dashboard/search/check-in mix from loadtest.py twice: once on its own and
+once while a crowd of front desk users logs in over and over, the way a
+shift change looks. p50/p95/p99 of the other endpoints are printed for both
+phases; with bcrypt on the hash pool the p99 should barely move:
+
+    python bench_login.py --logins 32 --duration 20
+"""
+from concurrent.futures import ThreadPoolExecutor
+from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import timedelta
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import requests
+
+from auth import create_access_token, get_password_hash
+from bench_json import wait_until_ready
+from generate_data import DEFAULT_PASSWORD, generate
+from loadtest import ROOT_DIR, parse_mix, run_worker, summarize
+
+DEFAULT_MIX = "checkin=25,dashboard=55,search=20"
+
+
+async def seed(args) -> dict:
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    db = client[args.db_name]
+    data = await generate(db, args.buildings, args.companies, args.visitors, 30, seed=args.seed, sample_size=2000)
+    # server.login reads the legacy "building" field, so these users carry it
+    password_hash = get_password_hash(DEFAULT_PASSWORD)
+    data["logins"] = [f"shift{i}@bench.example.com" for i in range(args.logins)]
+    await db.users.insert_many([
+        {"id": f"shift-{i}", "email": email, "password": password_hash, "name": f"Portaria {i}",
+         "role": "front_desk", "building": data["buildings"][i % len(data["buildings"])]["id"]}
+        for i, email in enumerate(data["logins"])
+    ])
+    client.close()
+    return data
+
+
+def login_worker(base_url: str, email: str, seconds: float) -> list:
+    session = requests.Session()
+    results = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            status = session.post(f"{base_url}/api/auth/login",
+                                  json={"email": email, "password": DEFAULT_PASSWORD}, timeout=30).status_code
+        except requests.RequestException:
+            status = 0
+        results.append(("POST /api/auth/login", time.perf_counter() - started, status))
+    return results
+
+
+def run_phase(base_url: str, token: str, data: dict, weights: dict, args, logins: int) -> dict:
+    with ThreadPoolExecutor(args.concurrency + logins) as executor:
+        started = time.perf_counter()
+        traffic = [executor.submit(run_worker, worker, base_url, token, data, weights, args.duration, args.seed)
+                   for worker in range(args.concurrency)]
+        bursts = [executor.submit(login_worker, base_url, data["logins"][i], args.duration) for i in range(logins)]
+        results = [result for future in traffic + bursts for result in future.result()]
+        elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API latency during a login burst")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_bench_login")
+    parser.add_argument("--buildings", type=int, default=10)
+    parser.add_argument("--companies", type=int, default=10, help="companies per building")
+    parser.add_argument("--visitors", type=int, default=50000)
+    parser.add_argument("--logins", type=int, default=32, help="users logging in at the same time")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    data = asyncio.run(seed(args))
+
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": args.db_name}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    token = create_access_token({"sub": "bench", "role": "super_admin"}, timedelta(hours=1))
+    try:
+        wait_until_ready(base_url)
+        run_worker(-1, base_url, token, data, weights, 2, args.seed)
+        quiet = run_phase(base_url, token, data, weights, args, 0)
+        burst = run_phase(base_url, token, data, weights, args, args.logins)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\n{'endpoint':<32} {'p99 quiet':>10} {'p99 burst':>10} {'change':>8}")
+    for label, endpoint in burst["endpoints"].items():
+        before = quiet["endpoints"].get(label)
+        if before is None:
+            print(f"{label:<32} {'':>10} {endpoint['p99Ms']:>10} "
+                  f"({endpoint['throughput']} req/s, {endpoint['errors']} errors)")
+            continue
+        change = (endpoint["p99Ms"] - before["p99Ms"]) / before["p99Ms"] * 100 if before["p99Ms"] else 0
+        print(f"{label:<32} {before['p99Ms']:>10} {endpoint['p99Ms']:>10} {change:>+7.1f}%")
+    print(json.dumps({"logins": args.logins, "quiet": quiet, "burst": burst}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare the old regex visitor search with the token prefix search.
+
+Seeds a throwaway database (1M visitors by default, see generate_data.py),
+then runs the same name prefixes through both queries against the busiest
+buildings and prints p50/p95/p99 latency and documents examined:
+
+    python bench_search.py --visitors 1000000 --queries 200
+    python bench_search.py --skip-seed
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DESCENDING
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from generate_data import generate
+from loadtest import percentile
+from routes.visitors import VISITOR_SUMMARY_FIELDS
+from search import ranked_search_pipeline
+
+
+def regex_query(building: str, search: str) -> dict:
+    # What GET /api/visitors sent before token search: unanchored, case-insensitive
+    return {"buildingId": building, "$or": [
+        {"fullName": {"$regex": search, "$options": "i"}},
+        {"representingCompany": {"$regex": search, "$options": "i"}}
+    ]}
+
+
+async def run_regex(db, building: str, search: str, limit: int) -> list:
+    return await db.visitors.find(regex_query(building, search), VISITOR_SUMMARY_FIELDS) \
+        .sort("createdAt", DESCENDING).limit(limit).to_list(limit)
+
+
+async def run_tokens(db, building: str, search: str, limit: int) -> list:
+    pipeline = ranked_search_pipeline({"buildingId": building}, search, limit, VISITOR_SUMMARY_FIELDS)
+    return await db.visitors.aggregate(pipeline).to_list(limit)
+
+
+async def docs_examined(db, building: str, search: str, limit: int) -> dict:
+    regex = await db.visitors.find(regex_query(building, search)).sort("createdAt", DESCENDING).limit(limit) \
+        .explain()
+    tokens = await db.command("explain", {
+        "aggregate": "visitors",
+        "pipeline": ranked_search_pipeline({"buildingId": building}, search, limit, VISITOR_SUMMARY_FIELDS),
+        "cursor": {}
+    }, verbosity="executionStats")
+
+    def examined(explain):
+        stats = explain.get("executionStats") or explain.get("stages", [{}])[0].get("$cursor", {}).get("executionStats", {})
+        return stats.get("totalDocsExamined")
+
+    return {"regex": examined(regex), "tokens": examined(tokens)}
+
+
+async def measure(db, runner, cases: list, limit: int) -> dict:
+    timings = []
+    matched = 0
+    for building, search in cases:
+        started = time.perf_counter()
+        matched += len(await runner(db, building, search, limit))
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "queries": len(cases),
+        "avgResults": round(matched / len(cases), 1),
+        "p50Ms": round(percentile(timings, 50) * 1000, 2),
+        "p95Ms": round(percentile(timings, 95) * 1000, 2),
+        "p99Ms": round(percentile(timings, 99) * 1000, 2)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark regex vs token prefix visitor search")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_bench_search")
+    parser.add_argument("--buildings", type=int, default=50)
+    parser.add_argument("--companies", type=int, default=20, help="companies per building")
+    parser.add_argument("--visitors", type=int, default=1000000)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from the previous run")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    if not args.skip_seed:
+        await client.drop_database(args.db_name)
+        started = time.perf_counter()
+        await generate(db, args.buildings, args.companies, args.visitors, seed=args.seed)
+        print(f"Seeded {args.visitors} visitors in {time.perf_counter() - started:.1f}s")
+
+    # Search where it hurts most: the buildings with the most visitors
+    busiest = await db.visitors.aggregate([
+        {"$group": {"_id": "$buildingId", "n": {"$sum": 1}}}, {"$sort": {"n": -1}}, {"$limit": 5}
+    ]).to_list(5)
+    names = await db.visitors.aggregate([{"$sample": {"size": args.queries}}, {"$project": {"fullName": 1}}]) \
+        .to_list(args.queries)
+    rng = random.Random(args.seed)
+    cases = [(rng.choice(busiest)["_id"], visitor["fullName"].split()[0][:rng.randint(3, 5)]) for visitor in names]
+
+    # Warm the cache so both sides are measured from memory
+    await measure(db, run_regex, cases[:10], args.limit)
+    await measure(db, run_tokens, cases[:10], args.limit)
+    result = {
+        "visitors": await db.visitors.estimated_document_count(),
+        "busiestBuildingVisitors": busiest[0]["n"],
+        "regex": await measure(db, run_regex, cases, args.limit),
+        "tokens": await measure(db, run_tokens, cases, args.limit),
+        "docsExamined": await docs_examined(db, *cases[0], args.limit)
+    }
+    client.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Optional
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+
+from images import ingest_image
+
+ROOT_DIR = Path(__file__).parent
+BLOB_STORE = os.environ.get('BLOB_STORE', 'local')  # local | gridfs
+BLOB_STORE_PATH = Path(os.environ.get('BLOB_STORE_PATH', ROOT_DIR / 'blobs'))
+CHUNK_SIZE = 256 * 1024
+
+# Visitor fields holding images, and the reference field each one moves to
+IMAGE_FIELDS = {"documentImage": "documentImageRef", "selfie": "selfieRef"}
+
+
+class BlobStore(ABC):
+    """Content-addressed storage: blobs are keyed by the SHA-256 of their bytes,
+    so the same image uploaded twice is stored once."""
+
+    @abstractmethod
+    async def put_stream(self, chunks: AsyncIterator[bytes], content_type: str) -> dict:
+        ...
+
+    @abstractmethod
+    def open_stream(self, key: str) -> AsyncIterator[bytes]:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    async def put(self, data: bytes, content_type: str) -> dict:
+        async def chunks():
+            view = memoryview(data)
+            for offset in range(0, len(view), CHUNK_SIZE):
+                yield bytes(view[offset:offset + CHUNK_SIZE])
+        return await self.put_stream(chunks(), content_type)
+
+    async def read(self, key: str) -> bytes:
+        return b"".join([chunk async for chunk in self.open_stream(key)])
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], content_type: str) -> dict:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: self.root.mkdir(parents=True, exist_ok=True))
+        digest = hashlib.sha256()
+        size = 0
+        tmp = await loop.run_in_executor(None, lambda: tempfile.NamedTemporaryFile(dir=self.root, delete=False))
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                await loop.run_in_executor(None, tmp.write, chunk)
+            await loop.run_in_executor(None, tmp.close)
+
+            key = digest.hexdigest()
+            path = self._path(key)
+
+            def commit():
+                if path.exists():
+                    # Already stored, drop the duplicate
+                    os.unlink(tmp.name)
+                    return
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp.name, path)
+
+            await loop.run_in_executor(None, commit)
+        except BaseException:
+            tmp.close()
+            if os.path.exists(tmp.name):
+                os.unlink(tmp.name)
+            raise
+        return {"key": key, "contentType": content_type, "size": size}
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self._path(key).is_file)
+
+    async def open_stream(self, key: str) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        handle = await loop.run_in_executor(None, open, self._path(key), "rb")
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, handle.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            handle.close()
+
+
+class GridFSBlobStore(BlobStore):
+    def __init__(self, db: AsyncIOMotorDatabase, bucket_name: str = "blobs"):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+
+    async def put_stream(self, chunks: AsyncIterator[bytes], content_type: str) -> dict:
+        # The key is only known once every byte is hashed, so spool first
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=4 * CHUNK_SIZE) as spool:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            key = digest.hexdigest()
+
+            if not await self.exists(key):
+                spool.seek(0)
+                await self.bucket.upload_from_stream(key, spool, metadata={"contentType": content_type})
+        return {"key": key, "contentType": content_type, "size": size}
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self.bucket.find({"filename": key}).limit(1).to_list(1))
+
+    async def open_stream(self, key: str) -> AsyncIterator[bytes]:
+        grid_out = await self.bucket.open_download_stream_by_name(key)
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+
+_local_store: Optional[LocalBlobStore] = None
+
+
+def get_blob_store(db: AsyncIOMotorDatabase) -> BlobStore:
+    global _local_store
+    if BLOB_STORE == 'gridfs':
+        return GridFSBlobStore(db)
+    if _local_store is None:
+        _local_store = LocalBlobStore(BLOB_STORE_PATH)
+    return _local_store
+
+
+def decode_data_url(value: str) -> tuple:
+    # "data:image/jpeg;base64,/9j/..." or a bare base64 string
+    content_type = "application/octet-stream"
+    if value.startswith("data:") and "," in value:
+        header, value = value.split(",", 1)
+        content_type = header[5:].split(";")[0] or content_type
+    try:
+        return base64.b64decode("".join(value.split()), validate=True), content_type
+    except (binascii.Error, ValueError):
+        raise ValueError("Image is not valid base64")
+
+
+def encode_data_url(data: bytes, content_type: str) -> str:
+    return f"data:{content_type};base64,{base64.b64encode(data).decode()}"
+
+
+async def store_visitor_images(store: BlobStore, visitor: dict) -> dict:
+    # Moves inline base64 images out of the visitor document, leaving a reference.
+    # Images are downscaled and recompressed first; the thumbnail is stored alongside.
+    for field, ref_field in IMAGE_FIELDS.items():
+        value = visitor.get(field)
+        if isinstance(value, str) and value:
+            data, _ = decode_data_url(value)
+            master, thumbnail, content_type = await ingest_image(data)
+            ref = await store.put(master, content_type)
+            ref["originalSize"] = len(data)
+            ref["thumbnail"] = await store.put(thumbnail, content_type)
+            visitor[ref_field] = ref
+            visitor[field] = None
+    return visitor
+
+
+async def load_visitor_images(store: BlobStore, visitor: dict) -> dict:
+    # Inverse of store_visitor_images for clients that still expect data URLs
+    images = {}
+    for field, ref_field in IMAGE_FIELDS.items():
+        ref = visitor.get(ref_field)
+        if ref:
+            images[field] = encode_data_url(await store.read(ref["key"]), ref["contentType"])
+        else:
+            images[field] = visitor.get(field)
+    return images
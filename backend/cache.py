@@ -0,0 +1,87 @@
+from typing import Awaitable, Callable, Hashable
+import asyncio
+import time
+
+
+class AsyncTTLCache:
+    """Per-key TTL cache for async loaders.
+
+    Concurrent misses for the same key share a single load. ``invalidate``
+    bumps a per-key generation so a load that started before the write can
+    never repopulate the cache with the stale value.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+        self._entries = {}
+        self._pending = {}
+        self._generations = {}
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable]):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            # The generation is read now, not when the task first runs, so an
+            # invalidate in between is never missed
+            pending = asyncio.ensure_future(self._load(key, loader, self._generations.get(key, 0)))
+            self._pending[key] = pending
+        return await asyncio.shield(pending)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable], generation: int):
+        started = time.perf_counter()
+        try:
+            value = await loader()
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+            elapsed = time.perf_counter() - started
+            self.loads += 1
+            self.load_seconds_total += elapsed
+            self.load_seconds_max = max(self.load_seconds_max, elapsed)
+
+        if self._generations.get(key, 0) == generation:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        return value
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+
+    def invalidate(self, key: Hashable):
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._entries.pop(key, None)
+        # A load already in flight may read pre-write data; let new callers start fresh
+        self._pending.pop(key, None)
+
+    def clear(self):
+        for key in list(self._entries) + list(self._pending):
+            self.invalidate(key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / total if total else 0.0,
+            "loads": self.loads,
+            "loadSecondsAvg": self.load_seconds_total / self.loads if self.loads else 0.0,
+            "loadSecondsMax": self.load_seconds_max
+        }
@@ -0,0 +1,94 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import Awaitable, Callable, Hashable, Optional
+import asyncio
+import logging
+import os
+
+from cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+CONFIG_VERSIONS_COLLECTION = "config_versions"
+# How often each worker compares its versions with the stamps in Mongo
+CONFIG_VERSION_CHECK_SECONDS = float(os.environ.get('CONFIG_VERSION_CHECK_SECONDS', 5))
+# Safety net only: entries are normally dropped by a version change long before this
+CONFIG_CACHE_TTL_SECONDS = float(os.environ.get('CONFIG_CACHE_TTL_SECONDS', 3600))
+
+SECTIONS = ("plans", "settings", "building_settings")
+
+
+class ConfigCache:
+    """In-process cache for rarely changing configuration.
+
+    Every section has a version stamp in ``config_versions``. Writers bump it
+    and drop their own copy straight away; the other workers notice the new
+    version on their next periodic check, so reads never touch Mongo while
+    the configuration stays unchanged.
+    """
+
+    def __init__(self, sections, ttl_seconds: float):
+        self.caches = {section: AsyncTTLCache(ttl_seconds) for section in sections}
+        self.versions = {}
+        self.version_checks = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, section: str, key: Hashable, loader: Callable[[], Awaitable]):
+        return await self.caches[section].get_or_load(key, loader)
+
+    def invalidate(self, section: str, key: Optional[Hashable] = None):
+        self.invalidations += 1
+        if key is None:
+            self.caches[section].clear()
+        else:
+            self.caches[section].invalidate(key)
+
+    async def bump(self, db: AsyncIOMotorDatabase, section: str, key: Optional[Hashable] = None):
+        # Call after the write so other workers never reload the old value
+        stamp = await db[CONFIG_VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": section},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = self.versions.get(section, 0)
+        self.versions[section] = stamp["version"]
+        # Another worker bumped in between: its change may touch other keys
+        self.invalidate(section, key if stamp["version"] == previous + 1 else None)
+
+    async def check_versions(self, db: AsyncIOMotorDatabase):
+        stamps = await db[CONFIG_VERSIONS_COLLECTION].find({}, {"version": 1}).to_list(None)
+        self.version_checks += 1
+        for stamp in stamps:
+            section, version = stamp["_id"], stamp.get("version", 0)
+            if section in self.caches and self.versions.get(section, 0) != version:
+                self.versions[section] = version
+                self.invalidate(section)
+
+    async def watch_versions(self, db: AsyncIOMotorDatabase, interval: float = CONFIG_VERSION_CHECK_SECONDS):
+        while True:
+            try:
+                await self.check_versions(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving cached values; they expire after the TTL at the latest
+                logger.error(f"Config version check failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        sections = {section: cache.stats() for section, cache in self.caches.items()}
+        hits = sum(s["hits"] for s in sections.values())
+        misses = sum(s["misses"] for s in sections.values())
+        return {
+            "entries": sum(s["entries"] for s in sections.values()),
+            "hits": hits,
+            "misses": misses,
+            "hitRatio": hits / (hits + misses) if hits + misses else 0.0,
+            "loads": sum(s["loads"] for s in sections.values()),
+            "versionChecks": self.version_checks,
+            "invalidations": self.invalidations
+        }
+
+
+config_cache = ConfigCache(SECTIONS, CONFIG_CACHE_TTL_SECONDS)
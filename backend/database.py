@@ -0,0 +1,222 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReadPreference, monitoring
+from pymongo.read_preferences import SecondaryPreferred
+from dotenv import load_dotenv
+from metrics import command_metrics
+from slowlog import slow_query_log
+from pathlib import Path
+from typing import Optional
+import argparse
+import asyncio
+import threading
+import time
+import os
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 0)) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 0)) or None
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 0)) or None
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000))
+# e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')
+MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+# How far behind the primary a secondary may be and still serve the heavy
+# reads routed by the "secondary" policy; the server minimum is 90 seconds
+MONGO_SECONDARY_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_SECONDARY_MAX_STALENESS_SECONDS', 90))
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks connection checkouts so pool saturation and wait time are visible."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connections_open = 0
+
+    def connection_check_out_started(self, event):
+        # Checkout start and finish are reported on the same thread
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "maxPoolSize": MONGO_MAX_POOL_SIZE,
+                "open": self.connections_open,
+                "checkedOut": self.checked_out,
+                "waiting": self.waiting,
+                "saturation": self.checked_out / MONGO_MAX_POOL_SIZE if MONGO_MAX_POOL_SIZE else 0.0,
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "waitSecondsAvg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "waitSecondsMax": self.wait_seconds_max
+            }
+
+
+pool_monitor = PoolMonitor()
+client: Optional[AsyncIOMotorClient] = None
+db: Optional[AsyncIOMotorDatabase] = None
+_routed = {}
+
+# Per-route read policies:
+#   primary   - reads that must see the caller's own writes (visitor status)
+#   secondary - stats, listings and exports, which tolerate bounded lag and
+#               otherwise compete with check-in writes on the primary
+READ_POLICIES = {
+    "primary": lambda: ReadPreference.PRIMARY,
+    "secondary": lambda: SecondaryPreferred(max_staleness=MONGO_SECONDARY_MAX_STALENESS_SECONDS),
+}
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "event_listeners": [pool_monitor, command_metrics, slow_query_log],
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+def connect() -> AsyncIOMotorDatabase:
+    global client, db
+    if client is None:
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], **client_options())
+        db = client[os.environ['DB_NAME']]
+    return db
+
+
+def close():
+    global client, db
+    if client is not None:
+        client.close()
+        client = None
+        db = None
+        _routed.clear()
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    return db if db is not None else connect()
+
+
+def read_database(policy: str) -> AsyncIOMotorDatabase:
+    if policy not in _routed:
+        _routed[policy] = get_database().with_options(read_preference=READ_POLICIES[policy]())
+    return _routed[policy]
+
+
+async def get_db() -> AsyncIOMotorDatabase:
+    return get_database()
+
+
+async def get_primary_db() -> AsyncIOMotorDatabase:
+    return read_database("primary")
+
+
+async def get_secondary_db() -> AsyncIOMotorDatabase:
+    return read_database("secondary")
+
+
+async def ping() -> float:
+    # Round trip to the server in milliseconds
+    started = time.perf_counter()
+    await get_database().command("ping")
+    return (time.perf_counter() - started) * 1000
+
+
+async def check_read_routing() -> dict:
+    # Reports which member serves each policy as {policy: "primary" | "secondary"};
+    # run it against a replica set (mongod --replSet rs0) to confirm secondary
+    # reads leave the primary
+    hello = await get_database().command("hello")
+    primary = hello.get("primary")
+    print(f"Replica set: {hello.get('setName') or '(standalone)'}, primary: {primary}")
+    routing = {}
+    for policy in READ_POLICIES:
+        plan = await read_database(policy).visitors.find({}).limit(1).explain()
+        server = plan.get("serverInfo", {})
+        address = f"{server.get('host')}:{server.get('port')}"
+        routing[policy] = "primary" if not primary or address == primary else "secondary"
+        print(f"  {policy:<10} -> {address} ({routing[policy]})")
+    return routing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MongoDB connection utilities")
+    parser.add_argument("command", choices=["ping", "routing"])
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            if args.command == "ping":
+                print(f"✅ Ping {await ping():.2f} ms")
+            else:
+                await check_read_routing()
+        finally:
+            close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
-from auth import decode_token
+from auth import decode_token_cached
 
 security = HTTPBearer()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     
     if payload is None:
         raise HTTPException(
@@ -28,7 +28,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "user_id": user_id, 
         "role": payload.get("role"),
         "buildingId": payload.get("buildingId"),
-        "companyId": payload.get("companyId")
+        "companyId": payload.get("companyId"),
+        # The routes still in server.py key on the legacy "building" claim
+        "building": payload.get("building") or payload.get("buildingId")
     }
 
 async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))) -> Optional[dict]:
@@ -0,0 +1,141 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi.encoders import jsonable_encoder
+from typing import AsyncIterator, Optional
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# local: events are published by the API process that made the write.
+# changestream: events come from a Mongo change stream on visitors (needs a
+# replica set) so every worker sees writes made by any other worker.
+VISITOR_EVENTS_SOURCE = os.environ.get('VISITOR_EVENTS_SOURCE', 'local')
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('VISITOR_EVENTS_QUEUE_SIZE', 100))
+HEARTBEAT_SECONDS = 15
+
+# Fields sent with each event; never images
+EVENT_FIELDS = ("id", "buildingId", "companyId", "fullName", "hostName", "status",
+                "checkInTime", "checkOutTime", "updatedAt")
+EVENT_PROJECTION = {"_id": 0, **{field: 1 for field in EVENT_FIELDS}}
+
+STATUS_EVENTS = {
+    "approved": "approved",
+    "denied": "denied",
+    "checked_out": "checked-out",
+    "checked-out": "checked-out",
+}
+
+
+class Subscription:
+    def __init__(self, building_id: Optional[str], company_id: Optional[str]):
+        self.building_id = building_id
+        self.company_id = company_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def matches(self, visitor: dict) -> bool:
+        if self.building_id and visitor.get("buildingId") != self.building_id:
+            return False
+        if self.company_id and visitor.get("companyId") != self.company_id:
+            return False
+        return True
+
+
+class EventBus:
+    """In-process pub/sub for visitor lifecycle events.
+
+    Each subscriber has a bounded queue. A slow client that lets its queue
+    fill up loses its oldest events rather than stalling publishers.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self.published = 0
+
+    def subscribe(self, building_id: Optional[str] = None, company_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(building_id, company_id)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, visitor: dict):
+        # Framed once here, not once per subscriber
+        data = json.dumps(jsonable_encoder({k: visitor.get(k) for k in EVENT_FIELDS}))
+        frame = f"event: {event_type}\ndata: {data}\n\n"
+        self.published += 1
+        for subscription in list(self._subscriptions):
+            if not subscription.matches(visitor):
+                continue
+            if subscription.queue.full():
+                subscription.queue.get_nowait()
+                subscription.dropped += 1
+            subscription.queue.put_nowait(frame)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in self._subscriptions)
+        }
+
+event_bus = EventBus()
+
+
+def event_type_for(before: dict, after: dict) -> Optional[str]:
+    if not before:
+        return "created"
+    status = after.get("status")
+    if status != before.get("status"):
+        return STATUS_EVENTS.get(status, "updated")
+    return "updated"
+
+
+def publish_visitor_change(before: dict, after: dict):
+    # Called after every visitor write. With the change-stream source the
+    # stream itself publishes, so local publishing is skipped.
+    if VISITOR_EVENTS_SOURCE != 'local':
+        return
+    event_type = event_type_for(before, after)
+    if event_type:
+        event_bus.publish(event_type, after)
+
+
+async def stream_events(subscription: Subscription) -> AsyncIterator[str]:
+    # Server-Sent Events framing, with a comment line as heartbeat so proxies
+    # keep idle connections open
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+async def watch_visitor_changes(db: AsyncIOMotorDatabase):
+    # Feeds the bus from a Mongo change stream; restarts after errors
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+    while True:
+        try:
+            async with db.visitors.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    visitor = change.get("fullDocument")
+                    if not visitor:
+                        continue
+                    if change["operationType"] == "insert":
+                        event_type = "created"
+                    else:
+                        updated = change.get("updateDescription", {}).get("updatedFields", {})
+                        event_type = STATUS_EVENTS.get(updated.get("status"), "updated") if "status" in updated else "updated"
+                    event_bus.publish(event_type, visitor)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Visitor change stream failed, retrying: {str(e)}")
+            await asyncio.sleep(5)
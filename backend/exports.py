@@ -0,0 +1,206 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi.encoders import jsonable_encoder
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+import argparse
+import asyncio
+import csv
+import io
+import os
+import zlib
+
+EXPORT_BATCH_SIZE = 5000
+
+# Everything a compliance log needs; images and internal fields are left out
+EXPORT_COLUMNS = [
+    "id", "buildingId", "companyId", "fullName", "hostName", "representingCompany",
+    "reason", "companions", "document", "status", "checkInTime", "checkOutTime",
+    "notes", "language", "createdAt", "updatedAt"
+]
+EXPORT_PROJECTION = {"_id": 0, **{column: 1 for column in EXPORT_COLUMNS}}
+TIMESTAMP_COLUMNS = {"checkInTime", "checkOutTime", "createdAt", "updatedAt"}
+
+CONTENT_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def export_query(building_id: str, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    query = {"buildingId": building_id}
+    if start or end:
+        query["createdAt"] = {}
+        if start:
+            query["createdAt"]["$gte"] = start
+        if end:
+            query["createdAt"]["$lt"] = end
+    return query
+
+
+async def _batches(db: AsyncIOMotorDatabase, query: dict) -> AsyncIterator[list]:
+    cursor = db.visitors.find(query, EXPORT_PROJECTION).sort("createdAt", 1).batch_size(EXPORT_BATCH_SIZE)
+    batch = []
+    async for visitor in cursor:
+        batch.append(visitor)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _csv_chunks(db: AsyncIOMotorDatabase, query: dict) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    async for batch in _batches(db, query):
+        writer.writerows(jsonable_encoder(batch))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    # File object for pyarrow that hands written bytes back in pieces
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _as_timestamp(value) -> Optional[datetime]:
+    # Visitors updated through the generic PUT may carry ISO strings
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _as_int(value) -> Optional[int]:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            return None
+    if not isinstance(value, int) or not -2 ** 63 <= value < 2 ** 63:
+        return None
+    return int(value)
+
+
+def _as_string(value) -> Optional[str]:
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+# Parquet has a fixed schema, but stored visitors are not validated on every
+# write; values that do not fit their column are converted or left empty
+# rather than failing the export halfway through the response
+COLUMN_COERCIONS = {
+    column: _as_timestamp if column in TIMESTAMP_COLUMNS else _as_int if column == "companions" else _as_string
+    for column in EXPORT_COLUMNS
+}
+
+
+async def _parquet_chunks(db: AsyncIOMotorDatabase, query: dict) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.timestamp("ms") if column in TIMESTAMP_COLUMNS
+         else pa.int64() if column == "companions" else pa.string())
+        for column in EXPORT_COLUMNS
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        # One row group per batch, flushed to the client as soon as it is written
+        async for batch in _batches(db, query):
+            table = pa.Table.from_pylist(
+                [{column: coerce(visitor.get(column)) for column, coerce in COLUMN_COERCIONS.items()}
+                 for visitor in batch],
+                schema=schema
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_visitors(db: AsyncIOMotorDatabase, query: dict, fmt: str, gzip: bool = False) -> AsyncIterator[bytes]:
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow")
+        chunks = _parquet_chunks(db, query)
+    elif fmt == "csv":
+        chunks = _csv_chunks(db, query)
+    else:
+        raise ValueError("Format must be csv or parquet")
+    return _gzip(chunks) if gzip else chunks
+
+
+def export_filename(building_id: str, fmt: str, gzip: bool) -> str:
+    return f"visitors-{building_id}.{fmt}" + (".gz" if gzip else "")
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Export a building's visitor history")
+    parser.add_argument("--building", required=True)
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", "-o")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    output = args.output or export_filename(args.building, args.format, args.gzip)
+    written = 0
+    with open(output, "wb") as handle:
+        async for chunk in export_visitors(db, export_query(args.building, args.start, args.end), args.format, args.gzip):
+            handle.write(chunk)
+            written += len(chunk)
+
+    print(f"✅ Wrote {written} bytes to {output}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
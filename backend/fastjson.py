@@ -0,0 +1,36 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+from typing import Any, Type
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Opt-in: FAST_JSON=1 serializes with orjson and lets trusted routes skip the
+# response_model re-validation. Without orjson installed the flag is ignored.
+FAST_JSON = os.environ.get('FAST_JSON', '0').lower() in ('1', 'true', 'yes') and orjson is not None
+
+default_response_class = ORJSONResponse if FAST_JSON else JSONResponse
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    # Reads exactly the fields the response schema declares, so the documents
+    # can be returned as-is without response_model filtering
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+
+def trusted_response(content: Any, response: Response = None):
+    """Return database output that was written through the models and read
+    with ``model_projection``.
+
+    With FAST_JSON the content goes straight to orjson; the route keeps its
+    ``response_model`` so the OpenAPI schema is unchanged. Otherwise it is
+    returned untouched and FastAPI validates and serializes it as usual.
+    """
+    if not FAST_JSON:
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,276 @@
+"""Synthetic data at scale, on top of the fixtures in seed_data.py.
+
+Creates buildings, companies, staff users and visitors spread over months,
+with weekday/hour arrival patterns, realistic status mixes and log-normal
+stay times. The same --seed always produces the same data:
+
+    python generate_data.py --buildings 2000 --visitors 5000000 --days 180 --drop
+"""
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Iterator
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from auth import get_password_hash
+from indexes import ensure_indexes
+from search import build_search_tokens
+from seed_data import PLANS, SYSTEM_SETTINGS
+from stats import rebuild_rollups
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+               "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vitória", "William",
+               "Beatriz", "Caio", "Daniela", "Eduardo", "Fernanda", "Gustavo", "Helena", "Igor", "Júlia", "Lucas"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+              "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+              "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas"]
+CITIES = [("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Belo Horizonte", "MG"), ("Curitiba", "PR"),
+          ("Porto Alegre", "RS"), ("Recife", "PE"), ("Brasília", "DF"), ("Salvador", "BA")]
+REASONS = ["Reunião", "Entrega", "Entrevista", "Manutenção", "Visita comercial", "Consultoria"]
+
+# Office traffic: weekdays dominate, with morning and early-afternoon peaks
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.15, 0.05]
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0.2, 1, 3, 5, 5, 4, 2, 3, 4, 4, 3, 2, 1, 0.3, 0.1, 0, 0, 0]
+# Stay time is log-normal around ~45 minutes
+STAY_MEDIAN_MINUTES = 45
+STAY_SIGMA = 0.7
+MAX_STAY_MINUTES = 10 * 60
+
+DEFAULT_PASSWORD = "loadtest123"
+
+
+def _uuid(rng: random.Random) -> str:
+    # Deterministic for a given seed, unlike uuid4()
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def random_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _arrival_days(start: datetime, days: int) -> tuple:
+    day_list = [start + timedelta(days=d) for d in range(days)]
+    return day_list, list(accumulate(WEEKDAY_WEIGHTS[day.weekday()] for day in day_list))
+
+
+def _visitor_status(rng: random.Random, arrival: datetime, now: datetime) -> str:
+    # Anything from a previous day has long since been resolved; today's
+    # visitors are still spread across the whole lifecycle
+    if arrival.date() < now.date():
+        return rng.choices(["checked-out", "denied", "approved", "checked-in"], [88, 5, 5, 2])[0]
+    return rng.choices(["pending", "approved", "checked-in", "checked-out", "denied"], [15, 15, 35, 30, 5])[0]
+
+
+def generate_visitors(rng: random.Random, companies: list, company_weights: list, count: int,
+                      days: int, now: datetime) -> Iterator[dict]:
+    start = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    # Cumulative weights once up front; choices() would otherwise rebuild
+    # them on every call, which dominates with tens of thousands of companies
+    day_list, day_weights = _arrival_days(start, days)
+    company_weights = list(accumulate(company_weights))
+    hours = list(range(24))
+    hour_weights = list(accumulate(HOUR_WEIGHTS))
+    for _ in range(count):
+        company = rng.choices(companies, cum_weights=company_weights)[0]
+        arrival = rng.choices(day_list, cum_weights=day_weights)[0] + timedelta(
+            hours=rng.choices(hours, cum_weights=hour_weights)[0], minutes=rng.randint(0, 59), seconds=rng.randint(0, 59)
+        )
+        if arrival > now:
+            arrival = now - timedelta(minutes=rng.randint(1, 60))
+        status = _visitor_status(rng, arrival, now)
+        check_in = arrival + timedelta(minutes=rng.randint(1, 10)) if status in ("checked-in", "checked-out") else None
+        check_out = None
+        if status == "checked-out":
+            stay = min(MAX_STAY_MINUTES, rng.lognormvariate(math.log(STAY_MEDIAN_MINUTES), STAY_SIGMA))
+            check_out = min(now, check_in + timedelta(minutes=stay))
+        visitor = {
+            "id": _uuid(rng),
+            "buildingId": company["buildingId"],
+            # The legacy field server.py's listing, stats and QR routes and
+            # the building-keyed indexes still read
+            "building": company["buildingId"],
+            "companyId": company["id"],
+            "fullName": random_name(rng),
+            "hostName": random_name(rng),
+            "representingCompany": rng.choice(["", "", "", f"{rng.choice(LAST_NAMES)} Ltda"]),
+            "reason": rng.choice(REASONS),
+            "companions": rng.choices([0, 1, 2, 3], [80, 12, 6, 2])[0],
+            "document": f"{rng.randint(10000000, 99999999)}",
+            "status": status,
+            "checkInTime": check_in,
+            "checkOutTime": check_out,
+            "notes": "",
+            "language": rng.choices(["pt", "en", "es"], [90, 7, 3])[0],
+            "documentImageRef": None,
+            "selfieRef": None,
+            "createdAt": arrival,
+            "updatedAt": check_out or check_in or arrival
+        }
+        visitor["searchTokens"] = build_search_tokens(visitor)
+        yield visitor
+
+
+async def _insert_batches(collection, documents: Iterator[dict], batch_size: int, parallel: int) -> int:
+    # Keeps up to `parallel` unordered insert_many calls in flight while the
+    # next batch is being generated
+    in_flight = set()
+    inserted = 0
+    batch = []
+
+    async def flush(docs):
+        nonlocal inserted
+        await collection.insert_many(docs, ordered=False)
+        inserted += len(docs)
+
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            in_flight.add(asyncio.ensure_future(flush(batch)))
+            batch = []
+            if len(in_flight) >= parallel:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+    if batch:
+        in_flight.add(asyncio.ensure_future(flush(batch)))
+    if in_flight:
+        for task in (await asyncio.wait(in_flight))[0]:
+            task.result()
+    return inserted
+
+
+async def generate(
+    db: AsyncIOMotorDatabase,
+    buildings: int,
+    companies_per_building: int,
+    visitors: int,
+    days: int = 180,
+    seed: int = 42,
+    batch_size: int = 5000,
+    parallel: int = 8,
+    sample_size: int = 0,
+    now: datetime = None
+) -> dict:
+    """Fill an empty database; returns the generated buildings and companies
+    plus up to ``sample_size`` visitors for callers that drive traffic."""
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+
+    # bcrypt is slow on purpose; hash once and share it across every user
+    password_hash = get_password_hash(DEFAULT_PASSWORD)
+
+    building_docs = []
+    for i in range(buildings):
+        city, state = rng.choice(CITIES)
+        plan = rng.choice(PLANS)
+        building_docs.append({
+            "id": _uuid(rng), "name": f"Edifício {rng.choice(LAST_NAMES)} {i}", "address": f"Rua {i}, {rng.randint(1, 3000)}",
+            "city": city, "state": state, "plan": plan["id"], "maxSuites": plan["maxSuites"],
+            "currentSuites": companies_per_building, "status": "active", "documentRequired": True,
+            "selfieRequired": rng.random() < 0.2, "defaultLanguage": "pt", "monthlyRevenue": plan["monthlyPrice"],
+            "adminEmail": f"admin{i}@building{i}.example.com", "createdAt": now - timedelta(days=days), "updatedAt": now
+        })
+
+    company_docs = []
+    user_docs = []
+    for i, building in enumerate(building_docs):
+        user_docs.append({"id": _uuid(rng), "email": building["adminEmail"], "password": password_hash,
+                          "name": random_name(rng), "role": "building_admin", "buildingId": building["id"]})
+        user_docs.append({"id": _uuid(rng), "email": f"portaria{i}@building{i}.example.com", "password": password_hash,
+                          "name": random_name(rng), "role": "front_desk", "buildingId": building["id"]})
+        for j in range(companies_per_building):
+            company = {
+                "id": _uuid(rng), "buildingId": building["id"], "name": f"{rng.choice(LAST_NAMES)} {j} Ltda",
+                "suite": str(100 + j), "status": "active", "receptionists": [],
+                "createdAt": building["createdAt"], "updatedAt": now
+            }
+            receptionist = {"id": _uuid(rng), "email": f"recepcao{j}@building{i}.example.com", "password": password_hash,
+                            "name": random_name(rng), "role": "company_receptionist",
+                            "buildingId": building["id"], "companyId": company["id"]}
+            company["receptionists"].append(receptionist["id"])
+            company_docs.append(company)
+            user_docs.append(receptionist)
+
+    await db.plans.insert_many([dict(plan) for plan in PLANS])
+    await db.settings.insert_one(dict(SYSTEM_SETTINGS))
+    await _insert_batches(db.buildings, iter(building_docs), batch_size, parallel)
+    await _insert_batches(db.companies, iter(company_docs), batch_size, parallel)
+    await _insert_batches(db.users, iter(user_docs), batch_size, parallel)
+
+    # A few busy buildings and many quiet ones, like real traffic
+    company_weights = [1 / (1 + (i // max(companies_per_building, 1))) ** 0.8 for i in range(len(company_docs))]
+    sample = []
+
+    def with_sample(documents):
+        for visitor in documents:
+            if len(sample) < sample_size:
+                sample.append({"id": visitor["id"], "buildingId": visitor["buildingId"], "fullName": visitor["fullName"]})
+            yield visitor
+
+    inserted = await _insert_batches(
+        db.visitors, with_sample(generate_visitors(rng, company_docs, company_weights, visitors, days, now)),
+        batch_size, parallel
+    )
+
+    # Indexes and rollups are cheaper to build once after the bulk load
+    await ensure_indexes(db)
+    await rebuild_rollups(db)
+
+    return {
+        "buildings": [{"id": b["id"]} for b in building_docs],
+        "companies": [{"id": c["id"], "buildingId": c["buildingId"]} for c in company_docs],
+        "visitors": sample,
+        "counts": {"buildings": len(building_docs), "companies": len(company_docs),
+                   "users": len(user_docs), "visitors": inserted}
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic AcessaAqui data")
+    parser.add_argument("--mongo-url", default=os.environ.get('MONGO_URL'))
+    parser.add_argument("--db-name", default=os.environ.get('DB_NAME'))
+    parser.add_argument("--buildings", type=int, default=1000)
+    parser.add_argument("--companies", type=int, default=20, help="companies per building")
+    parser.add_argument("--visitors", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=180, help="spread visitors over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, help="pin the end of the date range for byte-identical runs")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--parallel", type=int, default=8, help="concurrent insert_many batches")
+    parser.add_argument("--drop", action="store_true", help="drop the database first")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    if args.drop:
+        await client.drop_database(args.db_name)
+    db = client[args.db_name]
+    if await db.users.count_documents({}, limit=1):
+        print("Database is not empty, use --drop to replace it. Skipping...")
+        client.close()
+        return
+
+    started = time.perf_counter()
+    result = await generate(db, args.buildings, args.companies, args.visitors, args.days,
+                            args.seed, args.batch_size, args.parallel, now=args.now)
+    elapsed = time.perf_counter() - started
+    counts = result["counts"]
+    print(f"✅ Generated {counts['buildings']} buildings, {counts['companies']} companies, "
+          f"{counts['users']} users and {counts['visitors']} visitors in {elapsed:.1f}s "
+          f"({counts['visitors'] / elapsed:.0f} visitors/s)")
+    print(f"Every generated user logs in with password: {DEFAULT_PASSWORD}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+import hashlib
+import json
+import os
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+# Records expire through a TTL index on createdAt (see indexes.INDEXES)
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+# A claim left "in_progress" this long (worker crashed, request cancelled)
+# can be taken over by a retry
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+
+
+async def idempotent(
+    db: AsyncIOMotorDatabase,
+    key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[dict]],
+    response: Optional[Response] = None
+) -> dict:
+    """Run ``handler`` at most once per Idempotency-Key.
+
+    The first request claims the key with an insert; a retry with the same
+    key and body gets the stored result back instead of repeating the write.
+    Failed attempts release the key so the client can try again, so
+    ``handler`` should do the primary write only: side effects (rollups,
+    events) run after this returns, where failing cannot release a key whose
+    write already committed.
+    """
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+    record_id = f"{scope}:{key}"
+    fingerprint = _fingerprint(payload)
+    keys = db[IDEMPOTENCY_COLLECTION]
+    now = datetime.utcnow()
+    try:
+        await keys.insert_one({"_id": record_id, "fingerprint": fingerprint, "state": "in_progress", "createdAt": now})
+    except DuplicateKeyError:
+        record = await keys.find_one({"_id": record_id})
+        if record is not None and record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record is not None and record.get("state") == "done":
+            if response is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+            return record["response"]
+        stale = await keys.find_one_and_update(
+            {"_id": record_id, "state": "in_progress",
+             "createdAt": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)}},
+            {"$set": {"createdAt": now}}
+        )
+        if stale is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    try:
+        result = await handler()
+    except BaseException:
+        await keys.delete_one({"_id": record_id})
+        raise
+
+    await keys.update_one(
+        {"_id": record_id},
+        {"$set": {"state": "done", "response": jsonable_encoder(result, exclude={"_id"})}}
+    )
+    return result
@@ -0,0 +1,55 @@
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+import io
+import os
+
+from workers import cpu_pool
+
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 1600))
+IMAGE_THUMBNAIL_DIMENSION = int(os.environ.get('IMAGE_THUMBNAIL_DIMENSION', 320))
+IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'WEBP').upper()  # WEBP | JPEG
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))
+IMAGE_THUMBNAIL_QUALITY = int(os.environ.get('IMAGE_THUMBNAIL_QUALITY', 70))
+
+CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def process_image(data: bytes, max_dimension: int, thumbnail_dimension: int,
+                  fmt: str, quality: int, thumbnail_quality: int) -> tuple:
+    # Runs in a worker process: decode once, apply the EXIF orientation, then
+    # produce a bounded master and a thumbnail. Settings are passed in rather
+    # than read from globals so spawned workers see the parent's values.
+    if fmt == "WEBP" and not features.check("webp"):
+        fmt = "JPEG"
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        master = _encode(image, fmt, quality)
+
+        image.thumbnail((thumbnail_dimension, thumbnail_dimension), Image.LANCZOS)
+        thumbnail = _encode(image, fmt, thumbnail_quality)
+
+    return master, thumbnail, CONTENT_TYPES[fmt]
+
+
+async def ingest_image(data: bytes) -> tuple:
+    try:
+        return await cpu_pool.run(
+            process_image, data,
+            IMAGE_MAX_DIMENSION, IMAGE_THUMBNAIL_DIMENSION,
+            IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_THUMBNAIL_QUALITY
+        )
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("Image could not be decoded")
@@ -0,0 +1,161 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from typing import Awaitable, Callable, IO, Iterator, List, Optional
+import asyncio
+import json
+import math
+import zipfile
+import pandas as pd
+
+from models import VisitorCreate
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = {
+    ".csv": "csv", ".xlsx": "xlsx", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson",
+    "text/csv": "csv", "application/json": "json", "application/x-ndjson": "ndjson",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+
+def detect_format(filename: str, content_type: str) -> str:
+    for extension in (".csv", ".xlsx", ".json", ".ndjson", ".jsonl"):
+        if (filename or "").lower().endswith(extension):
+            return FORMATS[extension]
+    return FORMATS.get((content_type or "").split(";")[0].strip(), "")
+
+
+def _clean(row: dict) -> dict:
+    # Empty cells mean "use the default", not an empty string
+    cleaned = {}
+    for key, value in row.items():
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        cleaned[str(key).strip()] = value
+    return cleaned
+
+
+def _iter_xlsx(file: IO, chunk_size: int) -> Iterator[List[dict]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX import requires openpyxl")
+
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # read_only streams rows instead of loading the whole sheet
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, InvalidFileException):
+        raise ValueError("File is not a valid XLSX workbook")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, [])]
+        chunk = []
+        for values in rows:
+            chunk.append(dict(zip(header, values)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def iter_row_chunks(file: IO, fmt: str, chunk_size: int = IMPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    # Blocking generator; each next() is meant to run off the event loop
+    if fmt == "csv":
+        for frame in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            yield [_clean(row) for row in frame.to_dict("records")]
+    elif fmt == "ndjson":
+        for frame in pd.read_json(file, lines=True, chunksize=chunk_size, dtype=False):
+            yield [_clean(row) for row in frame.to_dict("records")]
+    elif fmt == "json":
+        # A JSON array has to be parsed whole; use NDJSON for very large files
+        data = json.load(file)
+        if isinstance(data, dict):
+            data = data.get("visitors", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of visitors")
+        for offset in range(0, len(data), chunk_size):
+            yield [_clean(row) if isinstance(row, dict) else {} for row in data[offset:offset + chunk_size]]
+    elif fmt == "xlsx":
+        for chunk in _iter_xlsx(file, chunk_size):
+            yield [_clean(row) for row in chunk]
+    else:
+        raise ValueError("Unsupported import format, use csv, xlsx, json or ndjson")
+
+
+def _describe(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+async def import_visitors(
+    db: AsyncIOMotorDatabase,
+    file: IO,
+    fmt: str,
+    defaults: dict,
+    build_document: Callable[[VisitorCreate], Awaitable[dict]],
+    overrides: Optional[dict] = None
+) -> dict:
+    # defaults fill columns the file leaves out; overrides (the caller's
+    # building/company scope) win over whatever the file says
+    loop = asyncio.get_running_loop()
+    chunks = iter_row_chunks(file, fmt)
+    inserted = 0
+    failed = 0
+    errors = []
+    row_number = 0
+
+    def report(row, messages):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row, "errors": messages})
+
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+
+        documents = []
+        rows = []
+        for row in chunk:
+            row_number += 1
+            if not row:
+                # Blank spreadsheet line
+                continue
+            try:
+                visitor_data = VisitorCreate(**{**defaults, **row, **(overrides or {})})
+                documents.append(await build_document(visitor_data))
+                rows.append(row_number)
+            except ValidationError as e:
+                report(row_number, _describe(e))
+            except ValueError as e:
+                report(row_number, [str(e)])
+
+        if not documents:
+            continue
+        try:
+            result = await db.visitors.insert_many(documents, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            inserted += e.details.get("nInserted", 0)
+            for write_error in write_errors:
+                report(rows[write_error["index"]], [write_error.get("errmsg", "Write failed")])
+
+    return {
+        "success": True,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errorsTruncated": failed > len(errors)
+    }
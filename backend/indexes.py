@@ -0,0 +1,180 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+from idempotency import IDEMPOTENCY_COLLECTION, IDEMPOTENCY_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ========== DECLARED INDEXES ==========
+# Every index the API relies on, by collection. Names are explicit so drift
+# can be detected by comparing against what the server reports.
+INDEXES = {
+    "visitors": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # routes/visitors.get_visitors: buildingId/companyId/status, newest first
+        # (createdAt, id) is the keyset order used by pagination.fetch_page
+        IndexModel([("buildingId", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="buildingId_status_createdAt_id"),
+        IndexModel([("buildingId", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="buildingId_createdAt_id"),
+        IndexModel([("companyId", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="companyId_status_createdAt_id"),
+        IndexModel([("status", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="status_createdAt_id"),
+        IndexModel([("createdAt", DESCENDING), ("id", DESCENDING)], name="createdAt_id"),
+        # search.search_filter: anchored prefix match on normalized tokens
+        IndexModel([("buildingId", ASCENDING), ("searchTokens", ASCENDING)],
+                   name="buildingId_searchTokens"),
+        IndexModel([("building", ASCENDING), ("searchTokens", ASCENDING)],
+                   name="building_searchTokens"),
+        # server.get_visitors: building + status in keyset order
+        IndexModel([("building", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="building_status_createdAt_id"),
+        IndexModel([("building", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+                   name="building_createdAt_id"),
+        # server.get_stats: check-ins since a date
+        IndexModel([("building", ASCENDING), ("checkInTime", DESCENDING)],
+                   name="building_checkInTime"),
+    ],
+    "companies": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("buildingId", ASCENDING)], name="buildingId"),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "buildings": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "plans": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "visitor_daily_stats": [
+        IndexModel([("building", ASCENDING), ("day", ASCENDING)], name="building_day_unique", unique=True),
+    ],
+    "building_settings": [
+        IndexModel([("buildingId", ASCENDING)], name="buildingId_unique", unique=True),
+    ],
+    # Claimed Idempotency-Keys are dropped by the server once they expire
+    IDEMPOTENCY_COLLECTION: [
+        IndexModel([("createdAt", ASCENDING)], name="createdAt_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+    ],
+}
+
+# Hot queries that must be served by an index: (collection, filter, sort)
+HOT_QUERIES = [
+    ("visitors", {"buildingId": "b", "status": "pending"}, [("createdAt", DESCENDING), ("id", DESCENDING)]),
+    ("visitors", {"buildingId": "b"}, [("createdAt", DESCENDING), ("id", DESCENDING)]),
+    ("visitors", {"companyId": "c", "status": "approved"}, [("createdAt", DESCENDING), ("id", DESCENDING)]),
+    ("visitors", {"building": "b", "status": "checked-in"}, [("createdAt", DESCENDING), ("id", DESCENDING)]),
+    ("visitors", {"building": "b"}, [("createdAt", DESCENDING), ("id", DESCENDING)]),
+    ("visitors", {"building": "b", "checkInTime": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("visitors", {"id": "v"}, None),
+    ("visitors", {"building": "b", "searchTokens": {"$regex": "^jo"}}, None),
+    ("visitors", {"buildingId": "b", "searchTokens": {"$regex": "^jo"}}, None),
+    ("companies", {"buildingId": "b"}, None),
+    ("companies", {"id": "c"}, None),
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"id": "u"}, None),
+    ("buildings", {"id": "b"}, None),
+    ("plans", {"id": "p"}, None),
+    ("building_settings", {"buildingId": "b"}, None),
+    ("visitor_daily_stats", {"building": "b", "day": {"$gte": "2024-01-01"}}, None),
+]
+
+
+def _spec(key, unique) -> tuple:
+    key = key.items() if hasattr(key, "items") else key
+    return (
+        [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in key],
+        bool(unique)
+    )
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    # create_index is a no-op when the same index already exists, so this is
+    # safe to run on every startup. Failures are logged, never raised.
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"Could not create index {collection}.{model.document['name']}: {str(e)}")
+    await report_index_drift(db)
+
+
+async def report_index_drift(db: AsyncIOMotorDatabase) -> dict:
+    drift = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+        declared = {m.document["name"]: m.document for m in models}
+
+        missing = [name for name in declared if name not in existing]
+        changed = [
+            name for name in declared
+            if name in existing
+            and _spec(declared[name]["key"], declared[name].get("unique")) != _spec(existing[name]["key"], existing[name].get("unique"))
+        ]
+        extra = [name for name in existing if name not in declared]
+
+        if missing or changed or extra:
+            drift[collection] = {"missing": missing, "changed": changed, "extra": extra}
+            logger.warning(f"Index drift on {collection}: missing={missing} changed={changed} extra={extra}")
+    return drift
+
+
+def _has_collscan(plan: dict) -> bool:
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages", [])
+    if "inputStage" in plan:
+        children = children + [plan["inputStage"]]
+    return any(_has_collscan(child) for child in children)
+
+
+async def check_query_plans(db: AsyncIOMotorDatabase) -> list:
+    # Runs explain() on every hot query and returns the ones that fall back
+    # to a collection scan. Meant to be run against a local mongod.
+    failures = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        # Servers using the slot-based engine nest the plan one level down
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        if _has_collscan(winning_plan):
+            failures.append({"collection": collection, "query": query, "sort": sort})
+    return failures
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    await ensure_indexes(db)
+    failures = await check_query_plans(db)
+    client.close()
+
+    if failures:
+        for failure in failures:
+            print(f"❌ COLLSCAN on {failure['collection']}: {failure['query']} sort={failure['sort']}")
+        raise SystemExit(1)
+    print("✅ All hot queries are served by an index")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+"""Single-machine load test for the API.
+
+Seeds a throwaway database on a local mongod, starts the API under uvicorn
+against it and drives a weighted mix of kiosk check-ins, dashboard polls,
+searches and QR badge fetches. Dashboards poll the building stats along with
+the visitor and company lists. Throughput and p50/p95/p99 per endpoint are
+printed and written as JSON, so runs can be compared between commits:
+
+    python loadtest.py --buildings 50 --visitors 200000 --duration 60
+    python loadtest.py --baseline loadtest-results/<earlier run>.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import requests
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from auth import create_access_token
+from bench_json import wait_until_ready
+from generate_data import random_name, generate
+
+DEFAULT_MIX = "checkin=25,dashboard=45,search=20,qr=10"
+SAMPLE_SIZE = 2000
+
+
+@lru_cache(maxsize=None)
+def building_token(building_id: str) -> str:
+    # /api/stats and the single-badge QR route read the caller's building
+    # from the token, as a lobby screen's login would carry it
+    return create_access_token({"sub": f"lobby-{building_id}", "role": "front_desk", "buildingId": building_id},
+                               timedelta(hours=2))
+
+
+async def seed(mongo_url: str, db_name: str, args) -> dict:
+    # Drops and refills the load-test database; returns ids the traffic mix samples from
+    client = AsyncIOMotorClient(mongo_url)
+    await client.drop_database(db_name)
+    data = await generate(client[db_name], args.buildings, args.companies, args.visitors, args.days,
+                          seed=args.seed, sample_size=SAMPLE_SIZE)
+    client.close()
+    return data
+
+
+class Scenarios:
+    """One method per traffic type; each returns the requests it made as
+    (endpoint label, seconds, status code) tuples."""
+
+    def __init__(self, base_url: str, token: str, data: dict, rng: random.Random):
+        self.base_url = base_url
+        self.rng = rng
+        self.data = data
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _call(self, label: str, method: str, path: str, **kwargs) -> tuple:
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=30, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        return label, time.perf_counter() - started, status
+
+    def checkin(self) -> list:
+        company = self.rng.choice(self.data["companies"])
+        return [self._call("POST /api/visitors", "POST", "/api/visitors", json={
+            "fullName": random_name(self.rng), "hostName": random_name(self.rng),
+            "companyId": company["id"], "buildingId": company["buildingId"], "reason": "Entrega"
+        })]
+
+    def dashboard(self) -> list:
+        building = self.rng.choice(self.data["buildings"])
+        status = self.rng.choice(["pending", "checked-in", None])
+        params = {"building_id": building["id"], "limit": 50}
+        if status:
+            params["status"] = status
+        lobby = {"Authorization": f"Bearer {building_token(building['id'])}"}
+        return [
+            self._call("GET /api/stats", "GET", "/api/stats", headers=lobby),
+            self._call("GET /api/visitors", "GET", "/api/visitors", params=params),
+            self._call("GET /api/companies", "GET", "/api/companies", params={"building_id": building["id"]}),
+        ]
+
+    def search(self) -> list:
+        visitor = self.rng.choice(self.data["visitors"])
+        # Kiosk staff usually type a prefix of the first name
+        prefix = visitor["fullName"].split()[0][:self.rng.randint(3, 5)]
+        return [self._call("GET /api/visitors?search", "GET", "/api/visitors",
+                           params={"building_id": visitor["buildingId"], "search": prefix, "limit": 20})]
+
+    def qr(self) -> list:
+        visitor = self.rng.choice(self.data["visitors"])
+        # Mostly a single badge printed at the desk, sometimes a batch
+        if self.rng.random() < 0.7:
+            lobby = {"Authorization": f"Bearer {building_token(visitor['buildingId'])}"}
+            return [self._call("GET /api/visitors/{id}/qrcode", "GET", f"/api/visitors/{visitor['id']}/qrcode",
+                               params={"format": "png"}, headers=lobby)]
+        return [self._call("POST /api/visitors/qrcodes", "POST", "/api/visitors/qrcodes",
+                           json={"visitorIds": [visitor["id"]]})]
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Scenarios, name.strip()):
+            raise ValueError(f"Unknown scenario: {name}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def run_worker(worker: int, base_url: str, token: str, data: dict, weights: dict, seconds: float, seed: int) -> list:
+    rng = random.Random(seed + worker)
+    scenarios = Scenarios(base_url, token, data, rng)
+    names = list(weights)
+    results = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        results.extend(getattr(scenarios, rng.choices(names, [weights[n] for n in names])[0])())
+    return results
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    by_endpoint = {}
+    for label, seconds, status in results:
+        by_endpoint.setdefault(label, []).append((seconds, status))
+    endpoints = {}
+    for label, samples in sorted(by_endpoint.items()):
+        latencies = sorted(seconds for seconds, _ in samples)
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, status in samples if status == 0 or status >= 400),
+            "throughput": round(len(samples) / elapsed, 1),
+            "meanMs": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+    return {
+        "totalRequests": len(results),
+        "throughput": round(len(results) / elapsed, 1),
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "endpoints": endpoints
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(summary: dict, baseline_path: str):
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)["summary"]["endpoints"]
+    print(f"\n{'endpoint':<32} {'p95 before':>11} {'p95 now':>9} {'change':>8}")
+    for label, now in summary["endpoints"].items():
+        before = baseline.get(label)
+        if before and before["p95Ms"]:
+            change = (now["p95Ms"] - before["p95Ms"]) / before["p95Ms"] * 100
+            print(f"{label:<32} {before['p95Ms']:>11} {now['p95Ms']:>9} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a local mongod and load test the API")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="acessaaqui_loadtest")
+    parser.add_argument("--buildings", type=int, default=20)
+    parser.add_argument("--companies", type=int, default=10, help="companies per building")
+    parser.add_argument("--visitors", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=90, help="spread visitors over this many days")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from the previous run")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="defaults to loadtest-results/<timestamp>-<commit>.json")
+    parser.add_argument("--baseline", help="earlier results file to compare p95 against")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+
+    if args.skip_seed:
+        async def load():
+            client = AsyncIOMotorClient(args.mongo_url)
+            db = client[args.db_name]
+            data = {
+                "buildings": await db.buildings.find({}, {"_id": 0, "id": 1}).to_list(None),
+                "companies": await db.companies.find({}, {"_id": 0, "id": 1, "buildingId": 1}).to_list(None),
+                "visitors": await db.visitors.find({}, {"_id": 0, "id": 1, "buildingId": 1, "fullName": 1})
+                                             .limit(SAMPLE_SIZE).to_list(None)
+            }
+            client.close()
+            return data
+        data = asyncio.run(load())
+    else:
+        started = time.perf_counter()
+        data = asyncio.run(seed(args.mongo_url, args.db_name, args))
+        print(f"Seeded {args.buildings} buildings, {len(data['companies'])} companies, "
+              f"{args.visitors} visitors in {time.perf_counter() - started:.1f}s")
+
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": args.db_name}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    token = create_access_token({"sub": "loadtest", "role": "super_admin"}, timedelta(hours=2))
+    try:
+        wait_until_ready(base_url)
+        # Short warm-up so pools, caches and indexes are hot before measuring
+        run_worker(-1, base_url, token, data, weights, 2, args.seed)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            batches = list(executor.map(
+                lambda worker: run_worker(worker, base_url, token, data, weights, args.duration, args.seed),
+                range(args.concurrency)
+            ))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary = summarize([result for batch in batches for result in batch], elapsed)
+    report = {
+        "commit": git_commit(),
+        "startedAt": datetime.utcnow().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "summary": summary
+    }
+
+    output = Path(args.output or ROOT_DIR / "loadtest-results" /
+                  f"{datetime.utcnow():%Y%m%dT%H%M%S}-{report['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print(f"\n{'endpoint':<32} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for label, endpoint in summary["endpoints"].items():
+        print(f"{label:<32} {endpoint['throughput']:>8} {endpoint['p50Ms']:>8} "
+              f"{endpoint['p95Ms']:>8} {endpoint['p99Ms']:>8} {endpoint['errors']:>7}")
+    print(f"\nTotal {summary['throughput']} req/s, {summary['errors']} errors. Results written to {output}")
+    if args.baseline:
+        compare(summary, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+from pymongo import monitoring
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+import bisect
+import re
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+
+class RequestMetrics:
+    """Mongo work done on behalf of one HTTP request."""
+
+    __slots__ = ("scope", "db_commands", "db_seconds", "_lock")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope)
+
+    def add_command(self, seconds: float):
+        # Motor runs commands on executor threads, possibly several at once
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+
+
+# Motor copies the context into its executor threads, so command listeners
+# see the RequestMetrics of the request that issued the command
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[tuple, int] = {}
+        self.latency: Dict[tuple, Histogram] = {}
+        self.response_size: Dict[tuple, Histogram] = {}
+        self.db_seconds: Dict[tuple, Histogram] = {}
+        self.db_commands: Dict[tuple, Histogram] = {}
+        self.mongo_commands: Dict[str, int] = {}
+        self.mongo_failures: Dict[str, int] = {}
+        self.mongo_seconds: Dict[str, float] = {}
+        self._sources: Dict[str, Callable[[], dict]] = {}
+
+    def register_stats(self, name: str, source: Callable[[], dict]):
+        # Numeric values of source() are exported as gauges on every scrape
+        self._sources[name] = source
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int, request: RequestMetrics):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+            self.db_seconds.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(request.db_seconds)
+            self.db_commands.setdefault(key, Histogram(COUNT_BUCKETS)).observe(request.db_commands)
+
+    def observe_command(self, command: str, seconds: float, failed: bool):
+        with self._lock:
+            self.mongo_commands[command] = self.mongo_commands.get(command, 0) + 1
+            self.mongo_seconds[command] = self.mongo_seconds.get(command, 0.0) + seconds
+            if failed:
+                self.mongo_failures[command] = self.mongo_failures.get(command, 0) + 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            _counter(lines, "http_requests_total", "HTTP requests served",
+                     {("method", "route", "status"): self.requests})
+            _histogram(lines, "http_request_duration_seconds", "Request latency", self.latency)
+            _histogram(lines, "http_response_size_bytes", "Response body size", self.response_size)
+            _histogram(lines, "http_request_db_seconds", "Mongo time per request", self.db_seconds)
+            _histogram(lines, "http_request_db_commands", "Mongo commands per request", self.db_commands)
+            _counter(lines, "mongo_commands_total", "Mongo commands issued",
+                     {("command",): {(k,): v for k, v in self.mongo_commands.items()}})
+            _counter(lines, "mongo_command_failures_total", "Mongo commands that failed",
+                     {("command",): {(k,): v for k, v in self.mongo_failures.items()}})
+            _counter(lines, "mongo_command_seconds_total", "Time spent in Mongo commands",
+                     {("command",): {(k,): v for k, v in self.mongo_seconds.items()}})
+        for name, source in self._sources.items():
+            try:
+                stats = source()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric = f"{name}_{_snake(key)}"
+                    lines.append(f"# TYPE {metric} gauge")
+                    lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _counter(lines: list, name: str, help_text: str, series: dict):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for names, values in series.items():
+        for label_values, value in values.items():
+            lines.append(f"{name}{_labels(names, label_values)} {value}")
+
+
+def _histogram(lines: list, name: str, help_text: str, series: Dict[tuple, Histogram]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in series.items():
+        labels = f'method="{method}",route="{route}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+registry = Registry()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed: bool):
+        seconds = event.duration_micros / 1e6
+        registry.observe_command(event.command_name, seconds, failed)
+        request = current_request.get()
+        if request is not None:
+            request.add_command(seconds)
+
+
+command_metrics = CommandMetrics()
+
+
+def route_label(scope: dict) -> str:
+    # The route template keeps label cardinality bounded; unmatched paths
+    # (404s, scanners) all share one label
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, response size and Mongo time per route,
+    with Server-Timing and X-Request-Time headers for the client."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(scope)
+        token = current_request.set(request)
+        started = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Streaming bodies are still being produced here, so this is
+                # the time to first byte
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = (f"app;dur={elapsed_ms:.1f}, "
+                          f'db;dur={request.db_seconds * 1000:.1f};desc="{request.db_commands} commands"')
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode()),
+                    (b"timing-allow-origin", b"*"),
+                    (b"x-request-time", f"{elapsed_ms:.1f}".encode()),
+                ]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            registry.observe_request(
+                scope["method"], request.route, status_code,
+                time.perf_counter() - started, size, request
+            )
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from blobstore import IMAGE_FIELDS, get_blob_store, store_visitor_images
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def migrate_visitor_images(db, store, batch_size: int) -> tuple:
+    # Returns (migrated, failed); visitors already moved to the store no
+    # longer match, so running it again only picks up what is left
+    inline_query = {"$or": [{field: {"$type": "string", "$ne": ""}} for field in IMAGE_FIELDS]}
+    projection = {"_id": 1, "id": 1, **{field: 1 for field in IMAGE_FIELDS}}
+
+    migrated = 0
+    failed = 0
+    last_id = None
+
+    while True:
+        # Walk by _id so visitors with undecodable images are not retried forever
+        query = inline_query if last_id is None else {"$and": [inline_query, {"_id": {"$gt": last_id}}]}
+        batch = await db.visitors.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        for visitor in batch:
+            last_id = visitor["_id"]
+            try:
+                await store_visitor_images(store, visitor)
+            except ValueError as e:
+                failed += 1
+                print(f"⚠️  Visitor {visitor.get('id')}: {str(e)}")
+                continue
+
+            update = {}
+            for field, ref_field in IMAGE_FIELDS.items():
+                if ref_field in visitor:
+                    update[field] = None
+                    update[ref_field] = visitor[ref_field]
+            await db.visitors.update_one({"_id": visitor["_id"]}, {"$set": update})
+            migrated += 1
+
+        print(f"... {migrated} visitors migrated")
+
+    return migrated, failed
+
+async def migrate_images(batch_size: int):
+    # MongoDB connection
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ['DB_NAME']]
+
+    migrated, failed = await migrate_visitor_images(db, get_blob_store(db), batch_size)
+    print(f"✅ Migrated images of {migrated} visitors ({failed} failed)")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move inline visitor images into the blob store")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(migrate_images(args.batch_size))
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date as date_type
 import uuid
 import re
 
@@ -98,7 +98,8 @@ class VisitorCreate(BaseModel):
     selfie: Optional[str] = None
     language: str = 'pt'
 
-class Visitor(BaseModel):
+class VisitorSummary(BaseModel):
+    # List views: everything except the image payloads
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     buildingId: str
     companyId: str
@@ -108,16 +109,57 @@ class Visitor(BaseModel):
     reason: str = ''
     companions: int = 0
     document: str = ''
-    documentImage: Optional[str] = None
-    selfie: Optional[str] = None
     status: str = 'pending'  # pending, approved, denied, checked_out
     checkInTime: Optional[datetime] = None
     checkOutTime: Optional[datetime] = None
     notes: str = ''
     language: str = 'pt'
+    # Blob store references ({key, contentType, size}) for stored images
+    documentImageRef: Optional[dict] = None
+    selfieRef: Optional[dict] = None
+    # Bumped on every write; documents written before versioning count as 0
+    version: int = 0
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
+class Visitor(VisitorSummary):
+    documentImage: Optional[str] = None
+    selfie: Optional[str] = None
+
+class VisitorImages(BaseModel):
+    documentImage: Optional[str] = None
+    selfie: Optional[str] = None
+
+class QRBadgeBatch(BaseModel):
+    # Either explicit visitor ids, or every visitor of a company (optionally on one day)
+    visitorIds: Optional[List[str]] = None
+    companyId: Optional[str] = None
+    date: Optional[date_type] = None
+    format: str = 'zip'  # zip, pdf
+
+    @validator('format')
+    def validate_format(cls, v):
+        if v not in ['zip', 'pdf']:
+            raise ValueError('Format must be zip or pdf')
+        return v
+
+# Target status -> statuses it may be reached from. A write that moves a visitor
+# into one of these only applies if the stored status is still a valid source.
+VISITOR_STATUS_TRANSITIONS = {
+    "approved": ("pending",),
+    "denied": ("pending", "approved"),
+    "checked-in": ("pending", "approved"),
+    "checked-out": ("pending", "approved", "checked-in"),
+    "checked_out": ("pending", "approved", "checked-in"),
+}
+
+def version_filter(version: int) -> dict:
+    # Documents written before versioning have no field at all
+    return {"version": version} if version else {"version": {"$in": [0, None]}}
+
+# Server-side projection for list endpoints, keeps images out of the wire
+VISITOR_SUMMARY_PROJECTION = {"_id": 0, "documentImage": 0, "selfie": 0, "searchTokens": 0}
+
 # ========== PLAN MODELS ==========
 class PlanUpdate(BaseModel):
     name: Optional[str] = None
@@ -0,0 +1,88 @@
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pymongo import DESCENDING
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+# Keyset order for visitor listings: newest first, id breaks ties
+KEYSET_SORT = [("createdAt", DESCENDING), ("id", DESCENDING)]
+# Both visitor listings hand the next page's cursor back in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(document: dict) -> str:
+    # Visitors written through the generic PUT can hold createdAt as a raw
+    # JSON string, and old imports may lack it; the cursor keeps the type
+    created_at = document.get("createdAt")
+    if isinstance(created_at, datetime):
+        key = created_at.isoformat()
+    elif isinstance(created_at, str):
+        key = {"string": created_at}
+    else:
+        key = None
+    raw = json.dumps([key, document["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        key, visitor_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(key, str):
+            return datetime.fromisoformat(key), visitor_id
+        if isinstance(key, dict):
+            return str(key["string"]), visitor_id
+        if key is None:
+            return None, visitor_id
+    except (ValueError, TypeError, KeyError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(query: dict, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return query
+    created_at, visitor_id = decode_cursor(cursor)
+    tie = {"createdAt": created_at, "id": {"$lt": visitor_id}}
+    # Sorted descending, dates come before strings and strings before missing
+    # values, so a page boundary also lets the later types through
+    if isinstance(created_at, datetime):
+        after = {"$or": [
+            {"createdAt": {"$lt": created_at}},
+            tie,
+            {"createdAt": {"$not": {"$type": "date"}}}
+        ]}
+    elif isinstance(created_at, str):
+        after = {"$or": [{"createdAt": {"$lt": created_at}}, tie, {"createdAt": None}]}
+    else:
+        after = tie
+    return {"$and": [query, after]} if query else after
+
+
+async def fetch_page(collection, query: dict, projection: dict, limit: int, cursor: Optional[str] = None) -> tuple:
+    # Fetches one extra row to know whether another page exists; the
+    # projection must keep createdAt and id, the cursor is built from them
+    documents = await collection.find(keyset_filter(query, cursor), projection) \
+        .sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+    return documents, next_cursor
+
+
+def ndjson_response(collection, query: dict, projection: dict) -> StreamingResponse:
+    # One JSON document per line, written as the Motor cursor yields batches,
+    # so memory stays flat no matter how many visitors match
+    async def generate():
+        cursor = collection.find(query, projection).sort(KEYSET_SORT).batch_size(STREAM_BATCH_SIZE)
+        async for document in cursor:
+            yield json.dumps(jsonable_encoder(document)) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
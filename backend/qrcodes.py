@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import hashlib
+import io
+import os
+import qrcode
+
+from workers import cpu_pool
+
+QR_CACHE_MAX_BYTES = int(os.environ.get('QR_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+QR_BOX_SIZE = 10
+QR_BORDER = 5
+
+
+def qr_payload(visitor: dict) -> str:
+    # Older visitors carry an explicit qrCode, newer ones are identified by id
+    return visitor.get("qrCode") or visitor["id"]
+
+
+def render_qr_png(data: str, box_size: int = QR_BOX_SIZE, border: int = QR_BORDER) -> bytes:
+    # Runs in a worker process
+    qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+BADGE_PAGE_SIZE = (620, 874)  # A6 at 150 dpi
+
+
+def render_badge_pdf(badges: list) -> bytes:
+    # Runs in a worker process. badges: [(png, title, subtitle)], one page each.
+    from PIL import Image, ImageDraw, ImageFont
+
+    title_font = ImageFont.load_default(size=32)
+    subtitle_font = ImageFont.load_default(size=22)
+    width, height = BADGE_PAGE_SIZE
+    pages = []
+
+    for png, title, subtitle in badges:
+        page = Image.new("RGB", BADGE_PAGE_SIZE, "white")
+        qr = Image.open(io.BytesIO(png)).convert("RGB")
+        side = min(qr.width, width - 80)
+        qr = qr.resize((side, side))
+        page.paste(qr, ((width - side) // 2, 60))
+
+        draw = ImageDraw.Draw(page)
+        y = 60 + side + 30
+        for text, font in ((title, title_font), (subtitle, subtitle_font)):
+            if text:
+                text_width = draw.textlength(text, font=font)
+                draw.text(((width - text_width) / 2, y), text, fill="black", font=font)
+                y += font.size + 16
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """LRU of rendered QR PNGs keyed by a digest of the payload and render
+    settings, bounded by total bytes rather than entry count."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+
+    @staticmethod
+    def key_for(data: str) -> str:
+        return hashlib.sha256(f"{QR_BOX_SIZE}:{QR_BORDER}:{data}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        png = self._entries.get(key)
+        if png is not None:
+            self._entries.move_to_end(key)
+        return png
+
+    def put(self, key: str, png: bytes):
+        if len(png) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size_bytes -= len(self._entries.pop(key))
+        self._entries[key] = png
+        self.size_bytes += len(png)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    async def render(self, data: str) -> tuple:
+        # Returns (key, png). Concurrent requests for the same payload share one render.
+        key = self.key_for(data)
+        png = self.get(key)
+        if png is not None:
+            self.hits += 1
+            return key, png
+
+        self.misses += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_and_store(key, data))
+            self._pending[key] = pending
+        # Shielded so one client disconnecting does not cancel the shared render
+        return key, await asyncio.shield(pending)
+
+    async def _render_and_store(self, key: str, data: str) -> bytes:
+        try:
+            png = await cpu_pool.run(render_qr_png, data)
+            self.put(key, png)
+            return png
+        finally:
+            self._pending.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "sizeBytes": self.size_bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRatio": self.hits / total if total else 0.0
+        }
+
+qr_cache = QRCodeCache(QR_CACHE_MAX_BYTES)
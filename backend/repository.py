@@ -0,0 +1,84 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import List, Optional
+
+DEFAULT_PROJECTION = {"_id": 0}
+
+
+class Repository:
+    """Data access for one collection whose documents are addressed by a
+    business key (``id`` unless stated otherwise; ``None`` for a collection
+    holding a single document).
+
+    Callers pass the database so they keep choosing the read policy
+    (see database.read_database). Updates are a single find_one_and_update
+    that returns the document, instead of update_one followed by find_one.
+    """
+
+    def __init__(self, collection: str, key: str = "id", projection: Optional[dict] = None):
+        self.collection = collection
+        self.key = key
+        self.projection = projection or DEFAULT_PROJECTION
+
+    def _filter(self, key_value, extra: Optional[dict]) -> dict:
+        query = {} if self.key is None else {self.key: key_value}
+        return {**query, **(extra or {})}
+
+    async def get(self, db: AsyncIOMotorDatabase, key_value, projection: Optional[dict] = None,
+                  match: Optional[dict] = None) -> Optional[dict]:
+        return await db[self.collection].find_one(self._filter(key_value, match), projection or self.projection)
+
+    async def find(self, db: AsyncIOMotorDatabase, query: Optional[dict] = None,
+                   projection: Optional[dict] = None, limit: int = 1000) -> List[dict]:
+        return await db[self.collection].find(query or {}, projection or self.projection).to_list(limit)
+
+    async def insert(self, db: AsyncIOMotorDatabase, document: dict) -> dict:
+        await db[self.collection].insert_one(document)
+        document.pop("_id", None)
+        return document
+
+    async def update(
+        self,
+        db: AsyncIOMotorDatabase,
+        key_value,
+        changes: dict,
+        projection: Optional[dict] = None,
+        match: Optional[dict] = None,
+        inc: Optional[dict] = None,
+        upsert: bool = False,
+        return_before: bool = False
+    ) -> Optional[dict]:
+        """Apply ``$set: changes`` atomically and return the document in one
+        round trip; None when nothing matched.
+
+        ``match`` adds conditions for compare-and-set writes. With
+        ``return_before`` the pre-image is returned, for callers that need
+        both sides of the change.
+        """
+        changes = {k: v for k, v in changes.items() if k not in ("_id", self.key)}
+        update = {}
+        if changes:
+            update["$set"] = changes
+        if inc:
+            update["$inc"] = inc
+        if not update:
+            return await db[self.collection].find_one(self._filter(key_value, match), projection or self.projection)
+        return await db[self.collection].find_one_and_update(
+            self._filter(key_value, match),
+            update,
+            projection=projection or self.projection,
+            upsert=upsert,
+            return_document=ReturnDocument.BEFORE if return_before else ReturnDocument.AFTER
+        )
+
+    async def delete(self, db: AsyncIOMotorDatabase, key_value) -> bool:
+        result = await db[self.collection].delete_one(self._filter(key_value, None))
+        return result.deleted_count > 0
+
+
+buildings = Repository("buildings")
+companies = Repository("companies")
+plans = Repository("plans")
+visitors = Repository("visitors")
+building_settings = Repository("building_settings", key="buildingId")
+system_settings = Repository("settings", key=None)
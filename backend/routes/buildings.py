@@ -2,22 +2,19 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from models import Building, BuildingCreate
 from dependencies import get_current_user
+from database import get_db, get_secondary_db
 from motor.motor_asyncio import AsyncIOMotorDatabase
+import repository
 import os
 
 router = APIRouter(prefix="/buildings", tags=["buildings"])
 
-async def get_db():
-    from server import db
-    return db
-
 @router.get("", response_model=List[Building])
 async def get_buildings(
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(get_secondary_db)
 ):
-    buildings = await db.buildings.find({}, {"_id": 0}).to_list(1000)
-    return buildings
+    return await repository.buildings.find(db)
 
 @router.get("/{building_id}", response_model=Building)
 async def get_building(
@@ -25,7 +22,7 @@ async def get_building(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    building = await db.buildings.find_one({"id": building_id}, {"_id": 0})
+    building = await repository.buildings.get(db, building_id)
     if not building:
         raise HTTPException(status_code=404, detail="Building not found")
     return building
@@ -50,7 +47,7 @@ async def create_building(
     from models import Building
     building = Building(**building_dict)
     
-    await db.buildings.insert_one(building.dict())
+    await repository.buildings.insert(db, building.dict())
     return building
 
 @router.put("/{building_id}", response_model=Building)
@@ -63,15 +60,9 @@ async def update_building(
     if current_user.get('role') not in ['super_admin', 'building_admin']:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    result = await db.buildings.update_one(
-        {"id": building_id},
-        {"$set": building_data}
-    )
-    
-    if result.modified_count == 0:
+    building = await repository.buildings.update(db, building_id, building_data)
+    if building is None:
         raise HTTPException(status_code=404, detail="Building not found")
-    
-    building = await db.buildings.find_one({"id": building_id}, {"_id": 0})
     return building
 
 @router.delete("/{building_id}")
@@ -83,9 +74,7 @@ async def delete_building(
     if current_user.get('role') != 'super_admin':
         raise HTTPException(status_code=403, detail="Only super admin can delete buildings")
     
-    result = await db.buildings.delete_one({"id": building_id})
-    
-    if result.deleted_count == 0:
+    if not await repository.buildings.delete(db, building_id):
         raise HTTPException(status_code=404, detail="Building not found")
     
     return {"success": True, "message": "Building deleted"}
@@ -2,28 +2,26 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from models import Company, CompanyCreate
 from dependencies import get_current_user
+from database import get_db, get_secondary_db
 from motor.motor_asyncio import AsyncIOMotorDatabase
+import repository
 from datetime import datetime
 import uuid
 
 router = APIRouter(prefix="/companies", tags=["companies"])
 
-async def get_db():
-    from server import db
-    return db
 
 @router.get("", response_model=List[Company])
 async def get_companies(
     building_id: str = None,
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(get_secondary_db)
 ):
     query = {}
     if building_id:
         query['buildingId'] = building_id
     
-    companies = await db.companies.find(query, {"_id": 0}).to_list(1000)
-    return companies
+    return await repository.companies.find(db, query)
 
 @router.get("/{company_id}", response_model=Company)
 async def get_company(
@@ -31,7 +29,7 @@ async def get_company(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    company = await db.companies.find_one({"id": company_id}, {"_id": 0})
+    company = await repository.companies.get(db, company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     return company
@@ -54,8 +52,7 @@ async def create_company(
     company_dict['createdAt'] = datetime.utcnow()
     company_dict['updatedAt'] = datetime.utcnow()
     
-    await db.companies.insert_one(company_dict)
-    return company_dict
+    return await repository.companies.insert(db, company_dict)
 
 @router.put("/{company_id}", response_model=Company)
 async def update_company(
@@ -69,15 +66,9 @@ async def update_company(
     
     company_data['updatedAt'] = datetime.utcnow()
     
-    result = await db.companies.update_one(
-        {"id": company_id},
-        {"$set": company_data}
-    )
-    
-    if result.modified_count == 0:
+    company = await repository.companies.update(db, company_id, company_data)
+    if company is None:
         raise HTTPException(status_code=404, detail="Company not found")
-    
-    company = await db.companies.find_one({"id": company_id}, {"_id": 0})
     return company
 
 @router.delete("/{company_id}")
@@ -89,9 +80,7 @@ async def delete_company(
     if current_user.get('role') not in ['super_admin', 'building_admin']:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    result = await db.companies.delete_one({"id": company_id})
-    
-    if result.deleted_count == 0:
+    if not await repository.companies.delete(db, company_id):
         raise HTTPException(status_code=404, detail="Company not found")
     
     return {"success": True, "message": "Company deleted"}
@@ -2,21 +2,20 @@ from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from models import Plan, PlanUpdate
 from dependencies import get_current_user
+from database import get_db
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from configcache import config_cache
+import repository
 
 router = APIRouter(prefix="/plans", tags=["plans"])
 
-async def get_db():
-    from server import db
-    return db
 
 @router.get("", response_model=List[Plan])
 async def get_plans(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    plans = await db.plans.find({}, {"_id": 0}).to_list(100)
-    return plans
+    return await config_cache.get_or_load("plans", "all", lambda: repository.plans.find(db, limit=100))
 
 @router.put("/{plan_id}", response_model=Plan)
 async def update_plan(
@@ -30,13 +29,8 @@ async def update_plan(
     
     update_data = {k: v for k, v in plan_data.dict().items() if v is not None}
     
-    result = await db.plans.update_one(
-        {"id": plan_id},
-        {"$set": update_data}
-    )
-    
-    if result.modified_count == 0:
+    plan = await repository.plans.update(db, plan_id, update_data)
+    if plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
-    
-    plan = await db.plans.find_one({"id": plan_id}, {"_id": 0})
+    await config_cache.bump(db, "plans")
     return plan
@@ -1,37 +1,41 @@
 from fastapi import APIRouter, HTTPException, Depends
 from models import SystemSettings
 from dependencies import get_current_user
+from database import get_db
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from configcache import config_cache
+import repository
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
-async def get_db():
-    from server import db
-    return db
+# Served until a super admin saves settings; never written on the read path
+DEFAULT_SETTINGS = {
+    "supportEmail": "neuraone.ai@gmail.com",
+    "brandName": "AcessaAqui",
+    "brandSlogan": "Acesso rápido, seguro e digital. Aqui.",
+    "lgpdText": "Ao prosseguir, você concorda com o uso dos seus dados exclusivamente para controle de acesso ao prédio.",
+    "emailTemplates": {
+        "visitorArrival": {
+            "subject": "Chegada do visitante [visitorName]",
+            "body": "[visitorName] chegou e aguarda autorização."
+        }
+    }
+}
+
+DEFAULT_BUILDING_SETTINGS = {
+    "documentRequired": False,
+    "selfieRequired": False,
+    "defaultLanguage": "pt"
+}
+
 
 @router.get("", response_model=SystemSettings)
 async def get_settings(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    settings = await db.settings.find_one({}, {"_id": 0})
-    if not settings:
-        # Return default settings
-        default_settings = {
-            "supportEmail": "neuraone.ai@gmail.com",
-            "brandName": "AcessaAqui",
-            "brandSlogan": "Acesso rápido, seguro e digital. Aqui.",
-            "lgpdText": "Ao prosseguir, você concorda com o uso dos seus dados exclusivamente para controle de acesso ao prédio.",
-            "emailTemplates": {
-                "visitorArrival": {
-                    "subject": "Chegada do visitante [visitorName]",
-                    "body": "[visitorName] chegou e aguarda autorização."
-                }
-            }
-        }
-        await db.settings.insert_one(default_settings)
-        return default_settings
-    return settings
+    settings = await config_cache.get_or_load("settings", "system", lambda: repository.system_settings.get(db, None))
+    return settings or DEFAULT_SETTINGS
 
 @router.put("", response_model=SystemSettings)
 async def update_settings(
@@ -42,15 +46,10 @@ async def update_settings(
     if current_user.get('role') != 'super_admin':
         raise HTTPException(status_code=403, detail="Only super admin can update settings")
     
-    settings_dict = settings_data.dict()
-    
-    result = await db.settings.update_one(
-        {},
-        {"$set": settings_dict},
-        upsert=True
-    )
+    settings = await repository.system_settings.update(db, None, settings_data.dict(), upsert=True)
+    await config_cache.bump(db, "settings")
     
-    return settings_dict
+    return settings
 
 @router.get("/building/{building_id}")
 async def get_building_settings(
@@ -58,17 +57,11 @@ async def get_building_settings(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    settings = await db.building_settings.find_one({"buildingId": building_id}, {"_id": 0})
-    if not settings:
-        default_settings = {
-            "buildingId": building_id,
-            "documentRequired": False,
-            "selfieRequired": False,
-            "defaultLanguage": "pt"
-        }
-        await db.building_settings.insert_one(default_settings)
-        return default_settings
-    return settings
+    settings = await config_cache.get_or_load(
+        "building_settings", building_id, lambda: repository.building_settings.get(db, building_id)
+    )
+    # Documents saved from a partial update lack the defaults, so merge them in
+    return {"buildingId": building_id, **DEFAULT_BUILDING_SETTINGS, **(settings or {})}
 
 @router.put("/building/{building_id}")
 async def update_building_settings(
@@ -80,12 +73,7 @@ async def update_building_settings(
     if current_user.get('role') not in ['super_admin', 'building_admin']:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    settings_data['buildingId'] = building_id
-    
-    result = await db.building_settings.update_one(
-        {"buildingId": building_id},
-        {"$set": settings_data},
-        upsert=True
-    )
-    
-    return settings_data
+    settings = await repository.building_settings.update(db, building_id, settings_data, upsert=True)
+    await config_cache.bump(db, "building_settings", building_id)
+    # An empty update of a building that never saved settings writes nothing
+    return {"buildingId": building_id, **DEFAULT_BUILDING_SETTINGS, **(settings or {})}
@@ -1,24 +1,80 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from models import Visitor, VisitorCreate
+from fastapi import APIRouter, HTTPException, Depends, File, Header, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from models import (
+    Visitor, VisitorCreate, VisitorSummary, VisitorImages, QRBadgeBatch,
+    VISITOR_STATUS_TRANSITIONS, VISITOR_SUMMARY_PROJECTION, version_filter
+)
 from dependencies import get_current_user
+from database import get_db, get_primary_db, get_secondary_db
+from blobstore import IMAGE_FIELDS, get_blob_store, load_visitor_images, store_visitor_images
+from events import event_bus, publish_visitor_change, stream_events
+from exports import CONTENT_TYPES as EXPORT_CONTENT_TYPES, export_filename, export_query, export_visitors
+from imports import detect_format, import_visitors
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, fetch_page, ndjson_response
+from qrcodes import qr_cache, qr_payload, render_badge_pdf
+from stats import record_visitor_change
+from search import SEARCH_FIELDS, build_search_tokens, ranked_search_pipeline
+from workers import cpu_pool
+from fastjson import model_projection, trusted_response
+from idempotency import idempotent
+import repository
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import io
+import logging
+import time
 import uuid
+import zipfile
 
 router = APIRouter(prefix="/visitors", tags=["visitors"])
+logger = logging.getLogger(__name__)
 
-async def get_db():
-    from server import db
-    return db
+MAX_QR_BATCH = 2000
+VISITOR_SUMMARY_FIELDS = model_projection(VisitorSummary)
+VISITOR_FIELDS = model_projection(Visitor)
 
-@router.get("", response_model=List[Visitor])
+
+def visitor_etag(visitor: dict) -> str:
+    return f'"{visitor.get("version", 0)}"'
+
+def visitor_scope(current_user: dict) -> dict:
+    # Filter that keeps a user to the visitors they may see: their company for
+    # receptionists, their building for building staff, everything for super admins
+    role = current_user.get('role')
+    if role == 'super_admin':
+        return {}
+    if role == 'company_receptionist' and current_user.get('companyId'):
+        return {"companyId": current_user['companyId']}
+    if role in ['front_desk', 'building_admin'] and current_user.get('buildingId'):
+        return {"buildingId": current_user['buildingId']}
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+def expected_version(if_match: Optional[str], body_version) -> Optional[int]:
+    # If-Match carries the ETag from a previous read; a "version" field in the
+    # body is accepted for clients that cannot set headers
+    value = if_match if if_match is not None else body_version
+    if value is None or value == "*":
+        return None
+    try:
+        return int(str(value).removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a visitor version")
+
+
+@router.get("", response_model=List[VisitorSummary])
 async def get_visitors(
+    response: Response,
     building_id: str = None,
     company_id: str = None,
     status: str = None,
+    search: str = None,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     current_user: dict = Depends(get_current_user),
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
 ):
     query = {}
     if building_id:
@@ -28,24 +84,188 @@ async def get_visitors(
     if status:
         query['status'] = status
     
-    visitors = await db.visitors.find(query, {"_id": 0}).sort("createdAt", -1).to_list(1000)
-    return visitors
+    if format == "ndjson":
+        return ndjson_response(db.visitors, query, VISITOR_SUMMARY_PROJECTION)
+    
+    if search:
+        # Ranked results are not cursor-paginated, only the top `limit` are returned
+        pipeline = ranked_search_pipeline(query, search, limit, VISITOR_SUMMARY_FIELDS)
+        return trusted_response(await db.visitors.aggregate(pipeline).to_list(limit))
+    
+    visitors, next_cursor = await fetch_page(db.visitors, query, VISITOR_SUMMARY_FIELDS, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return trusted_response(visitors, response)
+
+@router.get("/events")
+async def visitor_events(
+    building_id: str = None,
+    company_id: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    # Scoped users only ever see their own building/company; the query
+    # parameters narrow the stream for super admins only
+    scope = visitor_scope(current_user)
+    if scope:
+        building_id, company_id = scope.get('buildingId'), scope.get('companyId')
+    
+    subscription = event_bus.subscribe(building_id, company_id)
+    return StreamingResponse(
+        stream_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/export")
+async def export_visitor_history(
+    building_id: str,
+    start: datetime = None,
+    end: datetime = None,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_secondary_db)
+):
+    if current_user.get('role') not in ['super_admin', 'building_admin']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if current_user.get('role') == 'building_admin' and current_user.get('buildingId') != building_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    try:
+        chunks = export_visitors(db, export_query(building_id, start, end), format, gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = export_filename(building_id, format, gzip)
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_CONTENT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/{visitor_id}", response_model=Visitor)
 async def get_visitor(
     visitor_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    response: Response,
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
 ):
-    visitor = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
+    visitor = await repository.visitors.get(db, visitor_id, VISITOR_FIELDS)
     if not visitor:
         raise HTTPException(status_code=404, detail="Visitor not found")
-    return visitor
+    response.headers["ETag"] = visitor_etag(visitor)
+    return trusted_response(visitor, response)
 
-@router.post("", response_model=Visitor)
-async def create_visitor(
-    visitor_data: VisitorCreate,
-    db: AsyncIOMotorDatabase = Depends(get_db)
+@router.get("/{visitor_id}/images", response_model=VisitorImages)
+async def get_visitor_images(
+    visitor_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
+):
+    visitor = await repository.visitors.get(
+        db, visitor_id, {"_id": 0, "documentImage": 1, "selfie": 1, "documentImageRef": 1, "selfieRef": 1}
+    )
+    if not visitor:
+        raise HTTPException(status_code=404, detail="Visitor not found")
+    return await load_visitor_images(get_blob_store(db), visitor)
+
+@router.get("/{visitor_id}/images/{field}")
+async def download_visitor_image(
+    visitor_id: str,
+    field: str,
+    request: Request,
+    size: str = Query("full", pattern="^(full|thumbnail)$"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
 ):
+    ref_field = IMAGE_FIELDS.get(field)
+    if ref_field is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    visitor = await repository.visitors.get(db, visitor_id, {"_id": 0, ref_field: 1})
+    if not visitor:
+        raise HTTPException(status_code=404, detail="Visitor not found")
+    ref = visitor.get(ref_field)
+    if size == "thumbnail":
+        ref = ref.get("thumbnail") if ref else None
+    if not ref:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # Content-addressed, so the key is a strong validator that never changes
+    etag = f'"{ref["key"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    store = get_blob_store(db)
+    # Checked before streaming: once the 200 headers are out a missing blob
+    # can only break the connection
+    if not await store.exists(ref["key"]):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return StreamingResponse(store.open_stream(ref["key"]), media_type=ref["contentType"], headers=headers)
+
+@router.post("/qrcodes")
+async def create_qrcode_batch(
+    batch: QRBadgeBatch,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
+):
+    scope = visitor_scope(current_user)
+    if batch.visitorIds:
+        if len(batch.visitorIds) > MAX_QR_BATCH:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_QR_BATCH} badges per batch")
+        query = {"id": {"$in": batch.visitorIds}}
+    elif batch.companyId:
+        if scope.get("companyId", batch.companyId) != batch.companyId:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        query = {"companyId": batch.companyId}
+        if batch.date:
+            day_start = datetime.combine(batch.date, datetime.min.time())
+            query['createdAt'] = {"$gte": day_start, "$lt": day_start + timedelta(days=1)}
+    else:
+        raise HTTPException(status_code=400, detail="Provide visitorIds or companyId")
+    # Badges open the door, so only visitors inside the caller's scope are rendered
+    query.update(scope)
+    
+    started = time.perf_counter()
+    visitors = await db.visitors.find(
+        query, {"_id": 0, "id": 1, "qrCode": 1, "fullName": 1, "hostName": 1}
+    ).sort("fullName", 1).to_list(MAX_QR_BATCH + 1)
+    if not visitors:
+        raise HTTPException(status_code=404, detail="No visitors found")
+    if len(visitors) > MAX_QR_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QR_BATCH} badges per batch")
+    
+    # Renders fan out over the CPU process pool; cached codes are not re-rendered
+    rendered = await asyncio.gather(*(qr_cache.render(qr_payload(v)) for v in visitors))
+    
+    if batch.format == "pdf":
+        badges = [(png, v.get("fullName", ""), v.get("hostName", "")) for v, (_, png) in zip(visitors, rendered)]
+        content = await cpu_pool.run(render_badge_pdf, badges)
+        media_type, filename = "application/pdf", "badges.pdf"
+    else:
+        buffer = io.BytesIO()
+        # PNGs are already compressed, storing them avoids deflating twice
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for visitor, (_, png) in zip(visitors, rendered):
+                archive.writestr(f"{visitor['id']}.png", png)
+        content = buffer.getvalue()
+        media_type, filename = "application/zip", "badges.zip"
+    
+    elapsed = time.perf_counter() - started
+    rate = len(visitors) / elapsed if elapsed else 0
+    logger.info(f"Rendered {len(visitors)} badges as {batch.format} in {elapsed:.2f}s ({rate:.0f} badges/s)")
+    
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Badge-Count": str(len(visitors)),
+            "X-Badges-Per-Second": f"{rate:.1f}"
+        }
+    )
+
+async def new_visitor_document(visitor_data: VisitorCreate, db: AsyncIOMotorDatabase) -> dict:
     visitor_dict = visitor_data.dict()
     visitor_dict['id'] = str(uuid.uuid4())
     visitor_dict['status'] = 'pending'
@@ -56,30 +276,181 @@ async def create_visitor(
     visitor_dict['phone'] = visitor_dict.get('phone', '')
     visitor_dict['serviceProvider'] = visitor_dict.get('serviceProvider', False)
     visitor_dict['companionsDetails'] = visitor_dict.get('companionsDetails', [])
+    visitor_dict['version'] = 0
     visitor_dict['createdAt'] = datetime.utcnow()
     visitor_dict['updatedAt'] = datetime.utcnow()
-    
-    await db.visitors.insert_one(visitor_dict)
+    visitor_dict['searchTokens'] = build_search_tokens(visitor_dict)
+    await store_visitor_images(get_blob_store(db), visitor_dict)
     return visitor_dict
 
+@router.post("/import")
+async def import_visitor_file(
+    file: UploadFile = File(...),
+    building_id: str = None,
+    company_id: str = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user.get('role') not in ['super_admin', 'building_admin', 'company_receptionist']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    fmt = detect_format(file.filename, file.content_type)
+    if not fmt:
+        raise HTTPException(status_code=400, detail="Unsupported import format, use csv, xlsx, json or ndjson")
+    
+    # Columns missing from the spreadsheet fall back to these
+    defaults = {}
+    if building_id:
+        defaults['buildingId'] = building_id
+    if company_id:
+        defaults['companyId'] = company_id
+    
+    # Scoped users only import into their own building/company, whatever the
+    # query string or the file's columns say
+    overrides = {}
+    if current_user.get('role') != 'super_admin':
+        overrides = {k: v for k, v in current_user.items() if k in ('buildingId', 'companyId') and v}
+        if 'buildingId' not in overrides:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        if any(defaults.get(k, v) != v for k, v in overrides.items()):
+            raise HTTPException(status_code=403, detail="Not authorized")
+    
+    allowed_companies = None
+    if 'buildingId' in overrides and 'companyId' not in overrides:
+        allowed_companies = set(await db.companies.distinct("id", {"buildingId": overrides['buildingId']}))
+    
+    async def build_document(visitor_data: VisitorCreate) -> dict:
+        if allowed_companies is not None and visitor_data.companyId not in allowed_companies:
+            raise ValueError("companyId is not a company of this building")
+        return await new_visitor_document(visitor_data, db)
+    
+    try:
+        result = await import_visitors(db, file.file, fmt, defaults, build_document, overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await file.close()
+    
+    return result
+
+@router.post("", response_model=Visitor)
+async def create_visitor(
+    visitor_data: VisitorCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    created = []
+    
+    async def create():
+        try:
+            visitor_dict = await new_visitor_document(visitor_data, db)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        await db.visitors.insert_one(visitor_dict)
+        created.append(visitor_dict)
+        return visitor_dict
+    
+    # Kiosks retry on flaky networks; the same key never creates a second visitor
+    visitor = await idempotent(db, idempotency_key, "POST /visitors", visitor_data.dict(), create, response)
+    # Replays wrote nothing and notify nobody
+    for visitor_dict in created:
+        await notify_visitor_change(db, {}, visitor_dict)
+    return visitor
+
+async def notify_visitor_change(db: AsyncIOMotorDatabase, before: dict, after: dict):
+    # Runs after the visitor write (and its Idempotency-Key) is committed, so
+    # neither may fail the request: a retry would repeat the write
+    await record_visitor_change(db, after.get('buildingId') or before.get('buildingId'), before, after)
+    try:
+        publish_visitor_change(before, after)
+    except Exception:
+        logger.exception(f"Publishing the change to visitor {after.get('id')} failed")
+
+async def apply_visitor_update(db: AsyncIOMotorDatabase, visitor_id: str, visitor_data: dict,
+                               version: Optional[int]) -> Tuple[Optional[dict], dict]:
+    # Returns the visitor before and after the write; before is None when
+    # nothing was written because the request had already been applied
+    for field in ('_id', 'id', 'version', 'searchTokens'):
+        visitor_data.pop(field, None)
+    visitor_data['updatedAt'] = datetime.utcnow()
+    
+    # Keep search tokens in step with renamed visitors
+    if any(field in visitor_data for field in SEARCH_FIELDS):
+        current = await repository.visitors.get(db, visitor_id, {field: 1 for field in SEARCH_FIELDS})
+        if current:
+            visitor_data['searchTokens'] = build_search_tokens({**current, **visitor_data})
+    
+    try:
+        await store_visitor_images(get_blob_store(db), visitor_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Compare-and-set: status moves only from a valid source status, and the
+    # whole write only against the version the client last saw
+    match = {}
+    target = visitor_data.get('status')
+    if target in VISITOR_STATUS_TRANSITIONS:
+        match['status'] = {"$in": list(VISITOR_STATUS_TRANSITIONS[target])}
+    if version is not None:
+        match.update(version_filter(version))
+    
+    before = await repository.visitors.update(
+        db, visitor_id, visitor_data, VISITOR_FIELDS, match=match, inc={"version": 1}, return_before=True
+    )
+    
+    if before is None:
+        # Only the failure path pays for a second read, to say why
+        current = await repository.visitors.get(db, visitor_id, VISITOR_FIELDS)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Visitor not found")
+        if target is None or (version is not None and current.get('version', 0) != version):
+            raise HTTPException(status_code=409, detail="Visitor was modified by another request")
+        if current.get('status') != target:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Cannot change visitor status from {current.get('status')} to {target}"
+            )
+        if not set(visitor_data) - {'status', 'updatedAt'}:
+            # A retried or concurrent transition that already happened
+            return None, current
+        # The status is already there but the other fields are not; they
+        # apply only to the version just read
+        before = await repository.visitors.update(
+            db, visitor_id, visitor_data, VISITOR_FIELDS,
+            match=version_filter(current.get('version', 0)), inc={"version": 1}, return_before=True
+        )
+        if before is None:
+            raise HTTPException(status_code=409, detail="Visitor was modified by another request")
+    
+    after = {**before, **visitor_data, "version": before.get('version', 0) + 1}
+    after.pop('searchTokens', None)
+    return before, after
+
 @router.put("/{visitor_id}", response_model=Visitor)
 async def update_visitor(
     visitor_id: str,
     visitor_data: dict,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    visitor_data['updatedAt'] = datetime.utcnow()
+    version = expected_version(if_match, visitor_data.get('version'))
+    changes = []
     
-    result = await db.visitors.update_one(
-        {"id": visitor_id},
-        {"$set": visitor_data}
-    )
+    async def update():
+        before, after = await apply_visitor_update(db, visitor_id, dict(visitor_data), version)
+        if before is not None:
+            changes.append((before, after))
+        return after
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Visitor not found")
-    
-    visitor = await db.visitors.find_one({"id": visitor_id}, {"_id": 0})
+    visitor = await idempotent(db, idempotency_key, f"PUT /visitors/{visitor_id}", visitor_data, update, response)
+    for before, after in changes:
+        await notify_visitor_change(db, before, after)
+    response.headers["ETag"] = visitor_etag(visitor)
     return visitor
 
 @router.delete("/{visitor_id}")
@@ -88,9 +459,7 @@ async def delete_visitor(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    result = await db.visitors.delete_one({"id": visitor_id})
-    
-    if result.deleted_count == 0:
+    if not await repository.visitors.delete(db, visitor_id):
         raise HTTPException(status_code=404, detail="Visitor not found")
     
     return {"success": True, "message": "Visitor deleted"}
@@ -0,0 +1,103 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import List
+import asyncio
+import os
+import re
+import unicodedata
+
+# Visitor fields whose words are indexed for search. "name" and "company"
+# are the older visitor schema still written by server.py.
+SEARCH_FIELDS = ("fullName", "representingCompany", "name", "company")
+MAX_QUERY_TOKENS = 5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    # "João Ávila" -> "joao avila"
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return folded.lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def build_search_tokens(visitor: dict) -> List[str]:
+    tokens = []
+    for field in SEARCH_FIELDS:
+        value = visitor.get(field)
+        if isinstance(value, str):
+            for token in tokenize(value):
+                if token not in tokens:
+                    tokens.append(token)
+    return tokens
+
+
+def search_filter(search: str) -> dict:
+    # Every query word must prefix-match a stored token. Tokens only contain
+    # [a-z0-9], and are escaped anyway, so user input never reaches the regex
+    # engine as a pattern; the anchored prefix keeps it an index range scan.
+    tokens = tokenize(search)[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return {}
+    return {"$and": [{"searchTokens": {"$regex": f"^{re.escape(token)}"}} for token in tokens]}
+
+
+def ranked_search_pipeline(query: dict, search: str, limit: int, projection: dict) -> list:
+    # Documents matching whole words rank above prefix-only matches, newest first.
+    # The projection runs before the blocking $sort so it never holds whole
+    # documents, which on legacy visitors still carry inline base64 images.
+    tokens = tokenize(search)[:MAX_QUERY_TOKENS]
+    inclusive = any(value for field, value in projection.items() if field != "_id")
+    helpers = ["_score"]
+    if inclusive:
+        if not projection.get("createdAt"):
+            helpers.append("createdAt")
+        projection = {**projection, "_score": 1, "createdAt": 1}
+    return [
+        {"$match": {**query, **search_filter(search)}},
+        {"$addFields": {"_score": {"$size": {"$setIntersection": ["$searchTokens", tokens]}}}},
+        {"$project": projection},
+        {"$sort": {"_score": -1, "createdAt": -1}},
+        {"$limit": limit},
+        {"$unset": helpers},
+    ]
+
+
+async def backfill_search_tokens(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    # Adds searchTokens to visitors written before search indexing existed
+    updated = 0
+    batch = []
+    fields = {field: 1 for field in SEARCH_FIELDS}
+    cursor = db.visitors.find({"searchTokens": {"$exists": False}}, {"_id": 1, **fields})
+    async for visitor in cursor:
+        batch.append(UpdateOne({"_id": visitor["_id"]}, {"$set": {"searchTokens": build_search_tokens(visitor)}}))
+        if len(batch) >= batch_size:
+            await db.visitors.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.visitors.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    updated = await backfill_search_tokens(db)
+    print(f"✅ Search tokens written for {updated} visitors")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,25 @@ from models import UserInDB
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+PLANS = [
+    {"id": "start", "name": "Start", "minSuites": 1, "maxSuites": 20, "monthlyPrice": 149, "active": True, "description": "Ideal para prédios pequenos"},
+    {"id": "business", "name": "Business", "minSuites": 21, "maxSuites": 50, "monthlyPrice": 249, "active": True, "description": "Para prédios de médio porte"},
+    {"id": "corporate", "name": "Corporate", "minSuites": 51, "maxSuites": 100, "monthlyPrice": 399, "active": True, "description": "Para grandes empreendimentos"}
+]
+
+SYSTEM_SETTINGS = {
+    "supportEmail": "neuraone.ai@gmail.com",
+    "brandName": "AcessaAqui",
+    "brandSlogan": "Acesso rápido, seguro e digital. Aqui.",
+    "lgpdText": "Ao prosseguir, você concorda com o uso dos seus dados exclusivamente para controle de acesso ao prédio, conforme a LGPD. Solicite exclusão pelo e-mail: neuraone.ai@gmail.com",
+    "emailTemplates": {
+        "visitorArrival": {
+            "subject": "Chegada do visitante [visitorName] - AcessaAqui",
+            "body": "[visitorName] chegou para uma visita com [hostName] e aguarda autorização."
+        }
+    }
+}
+
 async def seed_database():
     # MongoDB connection
     mongo_url = os.environ['MONGO_URL']
@@ -24,12 +43,7 @@ async def seed_database():
         return
     
     # Seed Plans
-    plans = [
-        {"id": "start", "name": "Start", "minSuites": 1, "maxSuites": 20, "monthlyPrice": 149, "active": True, "description": "Ideal para prédios pequenos"},
-        {"id": "business", "name": "Business", "minSuites": 21, "maxSuites": 50, "monthlyPrice": 249, "active": True, "description": "Para prédios de médio porte"},
-        {"id": "corporate", "name": "Corporate", "minSuites": 51, "maxSuites": 100, "monthlyPrice": 399, "active": True, "description": "Para grandes empreendimentos"}
-    ]
-    await db.plans.insert_many(plans)
+    await db.plans.insert_many([dict(plan) for plan in PLANS])
     
     # Seed Buildings
     buildings = [{
@@ -68,19 +82,7 @@ async def seed_database():
     await db.users.insert_many(users)
     
     # Seed System Settings
-    settings = {
-        "supportEmail": "neuraone.ai@gmail.com",
-        "brandName": "AcessaAqui",
-        "brandSlogan": "Acesso rápido, seguro e digital. Aqui.",
-        "lgpdText": "Ao prosseguir, você concorda com o uso dos seus dados exclusivamente para controle de acesso ao prédio, conforme a LGPD. Solicite exclusão pelo e-mail: neuraone.ai@gmail.com",
-        "emailTemplates": {
-            "visitorArrival": {
-                "subject": "Chegada do visitante [visitorName] - AcessaAqui",
-                "body": "[visitorName] chegou para uma visita com [hostName] e aguarda autorização."
-            }
-        }
-    }
-    await db.settings.insert_one(settings)
+    await db.settings.insert_one(dict(SYSTEM_SETTINGS))
     
     print("✅ Database seeded successfully!")
     print("Super Admin: super@acessaaqui.com.br / super123")
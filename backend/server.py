@@ -1,33 +1,41 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, timedelta
-import qrcode
-import io
 import base64
 
 from models import (
     UserCreate, UserLogin, User, UserInDB,
-    VisitorCreate, Visitor
+    VisitorCreate, Visitor, VISITOR_STATUS_TRANSITIONS, VISITOR_SUMMARY_PROJECTION
 )
-from auth import verify_password, get_password_hash, create_access_token
+from auth import verify_password_async, get_password_hash_async, create_access_token, token_cache
 from dependencies import get_current_user
+from workers import hash_pool, cpu_pool
+from indexes import ensure_indexes
+from search import build_search_tokens, ranked_search_pipeline
+from blobstore import get_blob_store, store_visitor_images
+from qrcodes import QRCodeCache, qr_cache, qr_payload
+from configcache import config_cache
+from stats import get_building_stats, record_visitor_change, stats_cache
+from events import EVENT_PROJECTION, VISITOR_EVENTS_SOURCE, event_bus, publish_visitor_change, watch_visitor_changes
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, fetch_page, ndjson_response
+import database
+import repository
+from database import get_db, get_primary_db, get_secondary_db
+from fastjson import default_response_class
+from metrics import MetricsMiddleware, registry as metrics_registry
+from slowlog import slow_query_log
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 # Create the main app without a prefix
-app = FastAPI(title="AcessaAqui API")
+app = FastAPI(title="AcessaAqui API", default_response_class=default_response_class)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -53,7 +61,7 @@ logger = logging.getLogger(__name__)
 # ============= AUTHENTICATION ROUTES =============
 
 @api_router.post("/auth/register")
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     try:
         # Check if user already exists
         existing_user = await db.users.find_one({"email": user_data.email})
@@ -64,7 +72,7 @@ async def register(user_data: UserCreate):
             )
         
         # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         
         # Create user
         user_dict = user_data.dict()
@@ -86,7 +94,7 @@ async def register(user_data: UserCreate):
         )
 
 @api_router.post("/auth/login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, db: AsyncIOMotorDatabase = Depends(get_db)):
     try:
         # Find user
         user = await db.users.find_one({"email": credentials.email})
@@ -97,7 +105,7 @@ async def login(credentials: UserLogin):
             )
         
         # Verify password
-        if not verify_password(credentials.password, user["password"]):
+        if not await verify_password_async(credentials.password, user["password"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -135,14 +143,31 @@ async def login(credentials: UserLogin):
             detail="Error during login"
         )
 
+@api_router.get("/auth/hash-pool")
+async def get_hash_pool_stats(current_user: dict = Depends(get_current_user)):
+    if current_user.get('role') != 'super_admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return {"success": True, "data": hash_pool.stats()}
+
+@api_router.get("/auth/token-cache")
+async def get_token_cache_stats(current_user: dict = Depends(get_current_user)):
+    if current_user.get('role') != 'super_admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return {"success": True, "data": token_cache.stats()}
+
 
 # ============= VISITOR ROUTES =============
 
 @api_router.get("/visitors")
 async def get_visitors(
+    response: Response,
     status_filter: Optional[str] = "all",
     search: Optional[str] = "",
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
 ):
     try:
         # Build query
@@ -151,19 +176,23 @@ async def get_visitors(
         if status_filter != "all":
             query["status"] = status_filter
         
-        if search:
-            query["$or"] = [
-                {"name": {"$regex": search, "$options": "i"}},
-                {"company": {"$regex": search, "$options": "i"}}
-            ]
+        projection = VISITOR_SUMMARY_PROJECTION
         
-        visitors = await db.visitors.find(query).sort("checkInTime", -1).to_list(1000)
+        if format == "ndjson":
+            return ndjson_response(db.visitors, query, projection)
         
-        # Remove _id field
-        for visitor in visitors:
-            visitor.pop("_id", None)
+        if search:
+            # Indexed prefix search over normalized name/company tokens
+            pipeline = ranked_search_pipeline(query, search, limit, projection)
+            visitors = await db.visitors.aggregate(pipeline).to_list(limit)
+        else:
+            visitors, next_cursor = await fetch_page(db.visitors, query, projection, limit, cursor)
+            if next_cursor:
+                response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return {"success": True, "data": visitors}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error fetching visitors: {str(e)}")
         raise HTTPException(
@@ -174,7 +203,8 @@ async def get_visitors(
 @api_router.post("/visitors")
 async def create_visitor(
     visitor_data: VisitorCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     try:
         visitor = Visitor(
@@ -183,12 +213,19 @@ async def create_visitor(
             building=current_user["building"]
         )
         
-        await db.visitors.insert_one(visitor.dict())
-        
         visitor_dict = visitor.dict()
-        visitor_dict.pop("_id", None)
+        try:
+            await store_visitor_images(get_blob_store(db), visitor_dict)
+        except ValueError as e:
+            # Bad base64 or an undecodable image is the client's fault
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        await db.visitors.insert_one({**visitor_dict, "searchTokens": build_search_tokens(visitor_dict)})
+        await record_visitor_change(db, current_user["building"], {}, visitor_dict)
+        publish_visitor_change({}, visitor_dict)
         
         return {"success": True, "data": visitor_dict}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error creating visitor: {str(e)}")
         raise HTTPException(
@@ -199,26 +236,46 @@ async def create_visitor(
 @api_router.put("/visitors/{visitor_id}/checkout")
 async def checkout_visitor(
     visitor_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     try:
-        result = await db.visitors.update_one(
-            {"id": visitor_id, "building": current_user["building"]},
-            {
-                "$set": {
-                    "checkOutTime": datetime.utcnow(),
-                    "status": "checked-out",
-                    "updatedAt": datetime.utcnow()
-                }
-            }
+        changes = {
+            "checkOutTime": datetime.utcnow(),
+            "status": "checked-out",
+            "updatedAt": datetime.utcnow()
+        }
+        # Only a visitor that is not checked out yet moves, so a retried or
+        # concurrent checkout can never overwrite the first checkOutTime
+        before = await repository.visitors.update(
+            db, visitor_id, changes, EVENT_PROJECTION,
+            match={
+                "building": current_user["building"],
+                "status": {"$in": list(VISITOR_STATUS_TRANSITIONS["checked-out"])}
+            },
+            inc={"version": 1}, return_before=True
         )
         
-        if result.modified_count == 0:
+        if before is None:
+            current = await repository.visitors.get(
+                db, visitor_id, {"_id": 0, "status": 1}, match={"building": current_user["building"]}
+            )
+            if current is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Visitor not found"
+                )
+            if current.get("status") in ("checked-out", "checked_out"):
+                return {"success": True, "message": "Check-out successful"}
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Visitor not found"
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Cannot check out a visitor with status {current.get('status')}"
             )
         
+        after = {**before, **changes}
+        await record_visitor_change(db, current_user["building"], before, after)
+        publish_visitor_change(before, after)
+        
         return {"success": True, "message": "Check-out successful"}
     except HTTPException as e:
         raise e
@@ -232,13 +289,16 @@ async def checkout_visitor(
 @api_router.get("/visitors/{visitor_id}/qrcode")
 async def get_visitor_qrcode(
     visitor_id: str,
-    current_user: dict = Depends(get_current_user)
+    request: Request,
+    format: str = Query("json", pattern="^(json|png)$"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_primary_db)
 ):
     try:
-        visitor = await db.visitors.find_one({
-            "id": visitor_id,
-            "building": current_user["building"]
-        })
+        visitor = await db.visitors.find_one(
+            {"id": visitor_id, "building": current_user["building"]},
+            {"_id": 0, "id": 1, "qrCode": 1}
+        )
         
         if not visitor:
             raise HTTPException(
@@ -246,22 +306,23 @@ async def get_visitor_qrcode(
                 detail="Visitor not found"
             )
         
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(visitor["qrCode"])
-        qr.make(fit=True)
+        payload = qr_payload(visitor)
         
-        img = qr.make_image(fill_color="black", back_color="white")
+        if format == "png":
+            # The payload never changes, so its cache key doubles as a strong ETag
+            etag = f'"{QRCodeCache.key_for(payload)}"'
+            headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            _, png = await qr_cache.render(payload)
+            return Response(content=png, media_type="image/png", headers=headers)
         
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+        _, png = await qr_cache.render(payload)
+        img_base64 = base64.b64encode(png).decode()
         
         return {
             "success": True,
-            "qrCode": visitor["qrCode"],
+            "qrCode": payload,
             "qrCodeImage": f"data:image/png;base64,{img_base64}"
         }
     except HTTPException as e:
@@ -274,61 +335,38 @@ async def get_visitor_qrcode(
         )
 
 
+# ============= HEALTH ROUTES =============
+
+@api_router.get("/health")
+async def health():
+    try:
+        ping_ms = await database.ping()
+    except Exception as e:
+        logger.error(f"Database health check failed: {str(e)}")
+        return Response(
+            content='{"status":"unavailable"}',
+            media_type="application/json",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return {"status": "ok", "mongoPingMs": round(ping_ms, 2), "pool": database.pool_monitor.stats()}
+
+
 # ============= STATS ROUTES =============
 
 @api_router.get("/stats")
-async def get_stats(current_user: dict = Depends(get_current_user)):
+async def get_stats(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_secondary_db)
+):
     try:
-        building = current_user["building"]
-        now = datetime.utcnow()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Today's visitors
-        today_visitors = await db.visitors.count_documents({
-            "building": building,
-            "checkInTime": {"$gte": today_start}
-        })
-        
-        # Active visitors (checked in but not checked out)
-        active_visitors = await db.visitors.count_documents({
-            "building": building,
-            "status": "checked-in"
-        })
-        
-        # Total visitors this month
-        total_month = await db.visitors.count_documents({
-            "building": building,
-            "checkInTime": {"$gte": month_start}
-        })
-        
-        # Average stay time (simplified calculation)
-        completed_visits = await db.visitors.find({
-            "building": building,
-            "status": "checked-out",
-            "checkOutTime": {"$ne": None}
-        }).limit(100).to_list(100)
-        
-        if completed_visits:
-            total_minutes = 0
-            for visit in completed_visits:
-                delta = visit["checkOutTime"] - visit["checkInTime"]
-                total_minutes += delta.total_seconds() / 60
-            avg_minutes = total_minutes / len(completed_visits)
-            hours = int(avg_minutes // 60)
-            minutes = int(avg_minutes % 60)
-            avg_stay = f"{hours}h {minutes}min"
-        else:
-            avg_stay = "0h 0min"
+        # O(days) read of the daily rollups, or one $facet aggregation for
+        # buildings that have none yet. Served from a secondary, so a
+        # reload right after a write may lag by up to the staleness bound
+        stats = await get_building_stats(db, current_user["building"])
         
         return {
             "success": True,
-            "data": {
-                "todayVisitors": today_visitors,
-                "activeVisitors": active_visitors,
-                "totalVisitorsMonth": total_month,
-                "averageStayTime": avg_stay
-            }
+            "data": stats
         }
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
@@ -337,6 +375,31 @@ async def get_stats(current_user: dict = Depends(get_current_user)):
             detail="Error fetching stats"
         )
 
+@api_router.get("/stats/cache")
+async def get_stats_cache(current_user: dict = Depends(get_current_user)):
+    if current_user.get('role') != 'super_admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return {"success": True, "data": stats_cache.stats()}
+
+
+# ============= DIAGNOSTICS ROUTES =============
+
+@api_router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user.get('role') != 'super_admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return {"success": True, "data": {**slow_query_log.stats(), "queries": slow_query_log.recent(limit)}}
+
+@api_router.delete("/slow-queries")
+async def clear_slow_queries(current_user: dict = Depends(get_current_user)):
+    if current_user.get('role') != 'super_admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    slow_query_log.clear()
+    return {"success": True}
+
 
 # ============= NEWSLETTER ROUTES ============= (DEPRECATED)
 
@@ -369,8 +432,54 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers only let scripts read response headers listed here
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Outermost, so its timings cover CORS and exception handling too
+app.add_middleware(MetricsMiddleware)
+
+for name, source in {
+    "hash_pool": hash_pool.stats,
+    "cpu_pool": cpu_pool.stats,
+    "token_cache": token_cache.stats,
+    "stats_cache": stats_cache.stats,
+    "qr_cache": qr_cache.stats,
+    "config_cache": config_cache.stats,
+    "event_bus": event_bus.stats,
+    "mongo_pool": database.pool_monitor.stats,
+    "slow_queries": slow_query_log.stats,
+}.items():
+    metrics_registry.register_stats(name, source)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus text exposition format
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def startup_db_client():
+    # Registered first so the other startup hooks find the client open
+    database.connect()
+    slow_query_log.attach(asyncio.get_running_loop(), database.client)
+
+@app.on_event("startup")
+async def create_indexes():
+    # Built in the background so a large collection never delays startup
+    app.state.index_task = asyncio.create_task(ensure_indexes(database.get_database()))
+
+@app.on_event("startup")
+async def start_visitor_events():
+    if VISITOR_EVENTS_SOURCE == 'changestream':
+        app.state.visitor_events_task = asyncio.create_task(watch_visitor_changes(database.get_database()))
+
+@app.on_event("startup")
+async def start_config_version_checks():
+    # Picks up plan and settings changes made through other workers
+    app.state.config_versions_task = asyncio.create_task(config_cache.watch_versions(database.get_database()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    database.close()
+    hash_pool.shutdown()
+    cpu_pool.shutdown()
\ No newline at end of file
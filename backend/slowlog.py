@@ -0,0 +1,130 @@
+from pymongo import monitoring
+from collections import deque
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import os
+import threading
+
+from indexes import _has_collscan
+from metrics import current_request
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', 500))
+# Runs explain (queryPlanner only, no re-execution) for slow reads
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '0').lower() in ('1', 'true', 'yes')
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Driver and session bookkeeping that says nothing about the query itself
+IGNORED_FIELDS = {"lsid", "$clusterTime", "$db", "$readPreference", "txnNumber", "signature"}
+MAX_SHAPE_ITEMS = 20
+
+
+def query_shape(value, depth: int = 0):
+    """Replace literals with "?" so the same query with different values
+    always has the same shape."""
+    if depth > 10:
+        return "…"
+    if isinstance(value, dict):
+        return {k: query_shape(v, depth + 1) for k, v in value.items() if k not in IGNORED_FIELDS}
+    if isinstance(value, (list, tuple)):
+        # Pipelines and update statements keep their structure; scalar lists
+        # ($in values, inserted ids) collapse to a single placeholder
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value[:MAX_SHAPE_ITEMS]]
+        return ["?"]
+    return "?"
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Keeps the most recent Mongo commands that ran longer than the threshold."""
+
+    def __init__(self, threshold_ms: float, max_entries: int, explain: bool):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.entries = deque(maxlen=max_entries)
+        self.recorded = 0
+        self._started = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop, client):
+        # Explains are issued from the event loop through this client
+        self._loop = loop
+        self._client = client
+
+    def started(self, event):
+        # Only a reference is kept; the shape is worked out for slow commands only
+        request = current_request.get()
+        with self._lock:
+            self._started[(event.request_id, event.connection_id)] = (
+                event.command, request.route if request is not None else None
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            command, route = self._started.pop((event.request_id, event.connection_id), (None, None))
+        duration_ms = event.duration_micros / 1000
+        if command is None or duration_ms < self.threshold_ms or event.command_name == "explain":
+            return
+
+        # Inserted documents can carry images; only their count is kept
+        shape = query_shape({k: v for k, v in command.items() if k != "documents"})
+        if "documents" in command:
+            shape["documents"] = len(command["documents"])
+        target = command.get(event.command_name)
+        entry = {
+            "at": datetime.utcnow(),
+            "route": route or "background",
+            "command": event.command_name,
+            "database": event.database_name,
+            "collection": target if isinstance(target, str) else None,
+            "durationMs": round(duration_ms, 2),
+            "failed": failed,
+            "shape": shape,
+            "plan": None
+        }
+        self.entries.append(entry)
+        self.recorded += 1
+        logger.warning(f"Slow Mongo {event.command_name} on {entry['collection']} "
+                       f"took {duration_ms:.0f} ms ({entry['route']})")
+
+        if self.explain and event.command_name in EXPLAINABLE_COMMANDS and self._loop is not None:
+            explained = {k: v for k, v in command.items() if k not in IGNORED_FIELDS}
+            self._loop.call_soon_threadsafe(asyncio.ensure_future, self._explain(entry, explained))
+
+    async def _explain(self, entry: dict, command: dict):
+        try:
+            result = await self._client[entry["database"]].command({"explain": command, "verbosity": "queryPlanner"})
+            planner = result.get("queryPlanner", {})
+            winning_plan = planner.get("winningPlan", {})
+            winning_plan = winning_plan.get("queryPlan", winning_plan)
+            entry["plan"] = {"collscan": _has_collscan(winning_plan), "winningPlan": winning_plan}
+        except Exception as e:
+            entry["plan"] = {"error": str(e)}
+
+    def recent(self, limit: int = 100) -> list:
+        return list(self.entries)[-limit:][::-1]
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "thresholdMs": self.threshold_ms,
+            "entries": len(self.entries),
+            "recorded": self.recorded
+        }
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_BUFFER_SIZE, SLOW_QUERY_EXPLAIN)
@@ -0,0 +1,247 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional
+import argparse
+import asyncio
+import logging
+import os
+
+from cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+# One document per (building, day) plus one running-totals document per
+# building, all updated with $inc as visitors check in and out. A building's
+# rollups are only read once rebuild_rollups has stamped backfilledAt on its
+# totals document; until then they hold post-deploy writes only.
+ROLLUP_COLLECTION = "visitor_daily_stats"
+TOTALS_DAY = "totals"
+ACTIVE_STATUS = "checked-in"
+STATS_CACHE_TTL_SECONDS = float(os.environ.get('STATS_CACHE_TTL_SECONDS', 5))
+
+# Lobby dashboards poll the same building constantly; writes invalidate
+stats_cache = AsyncTTLCache(STATS_CACHE_TTL_SECONDS)
+
+
+def day_key(when: datetime) -> str:
+    return when.strftime("%Y-%m-%d")
+
+
+def format_stay(avg_minutes: float) -> str:
+    hours = int(avg_minutes // 60)
+    minutes = int(avg_minutes % 60)
+    return f"{hours}h {minutes}min"
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    # Visitors updated through the generic PUT may carry ISO strings
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    # Stored datetimes are naive UTC; an offset is converted, not dropped
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _rollup_deltas(building: str, before: dict, after: dict) -> list:
+    # [(rollup document filter, counters to $inc)] for one visitor write
+    active_delta = int(after.get("status") == ACTIVE_STATUS) - int(before.get("status") == ACTIVE_STATUS)
+    deltas = []
+    if active_delta:
+        deltas.append(({"building": building, "day": TOTALS_DAY}, {"active": active_delta}))
+
+    check_in = _as_datetime(after.get("checkInTime"))
+    if check_in and not before.get("checkInTime"):
+        deltas.append(({"building": building, "day": day_key(check_in)}, {"checkIns": 1}))
+
+    check_out = _as_datetime(after.get("checkOutTime"))
+    if check_out and check_in and not before.get("checkOutTime"):
+        deltas.append((
+            {"building": building, "day": day_key(check_out)},
+            {"checkOuts": 1, "stayCount": 1, "staySeconds": (check_out - check_in).total_seconds()}
+        ))
+    return deltas
+
+
+async def record_visitor_change(db: AsyncIOMotorDatabase, building: Optional[str], before: dict, after: dict):
+    # before/after are the visitor document around a write ({} for a new visitor)
+    # The visitor write has already happened, so a failure here is logged rather
+    # than failing the request; the building then falls back to the $facet
+    # path until its rollups are rebuilt
+    if not building:
+        return
+    updates = [
+        UpdateOne(rollup, {"$inc": counters}, upsert=True)
+        for rollup, counters in _rollup_deltas(building, before, after)
+    ]
+    try:
+        if updates:
+            await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+    except Exception as e:
+        logger.error(f"Visitor stats rollup update failed for building {building}: {str(e)}")
+        try:
+            await db[ROLLUP_COLLECTION].update_one(
+                {"building": building, "day": TOTALS_DAY}, {"$unset": {"backfilledAt": ""}}
+            )
+        except Exception as e:
+            logger.error(f"Could not mark rollups of building {building} for rebuild: {str(e)}")
+    finally:
+        stats_cache.invalidate(building)
+
+
+def _month_bounds(now: datetime) -> tuple:
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+    return today_start, month_start
+
+
+async def read_rollup_stats(db: AsyncIOMotorDatabase, building: str, now: datetime) -> Optional[dict]:
+    # Reads at most ~32 small documents; None until the building's rollups
+    # have been backfilled
+    today_start, month_start = _month_bounds(now)
+    today = day_key(today_start)
+    pipeline = [
+        {"$match": {"building": building, "$or": [{"day": {"$gte": day_key(month_start), "$lt": TOTALS_DAY}}, {"day": TOTALS_DAY}]}},
+        {"$group": {
+            "_id": None,
+            "backfilled": {"$max": {"$and": [
+                {"$eq": ["$day", TOTALS_DAY]},
+                # Missing and null sort below every date
+                {"$gt": ["$backfilledAt", None]}
+            ]}},
+            "todayVisitors": {"$sum": {"$cond": [{"$eq": ["$day", today]}, "$checkIns", 0]}},
+            "totalVisitorsMonth": {"$sum": "$checkIns"},
+            "activeVisitors": {"$sum": "$active"},
+            "staySeconds": {"$sum": "$staySeconds"},
+            "stayCount": {"$sum": "$stayCount"}
+        }}
+    ]
+    rows = await db[ROLLUP_COLLECTION].aggregate(pipeline).to_list(1)
+    if not rows or not rows[0]["backfilled"]:
+        return None
+    row = rows[0]
+    avg_minutes = row["staySeconds"] / row["stayCount"] / 60 if row["stayCount"] else 0
+    return {
+        "todayVisitors": row["todayVisitors"],
+        "activeVisitors": max(row["activeVisitors"], 0),
+        "totalVisitorsMonth": row["totalVisitorsMonth"],
+        "averageStayTime": format_stay(avg_minutes)
+    }
+
+
+async def compute_visitor_stats(db: AsyncIOMotorDatabase, building: str, now: datetime) -> dict:
+    # Single $facet aggregation over the visitors collection, used when a
+    # building's rollups have not been backfilled
+    today_start, month_start = _month_bounds(now)
+    pipeline = [
+        # Same visitors the rollups count: legacy documents carry building,
+        # newer ones only buildingId
+        {"$match": {"$or": [{"building": building}, {"buildingId": building}]}},
+        {"$facet": {
+            "today": [{"$match": {"checkInTime": {"$gte": today_start}}}, {"$count": "n"}],
+            "active": [{"$match": {"status": ACTIVE_STATUS}}, {"$count": "n"}],
+            "month": [{"$match": {"checkInTime": {"$gte": month_start}}}, {"$count": "n"}],
+            "stay": [
+                {"$match": {"checkOutTime": {"$gte": month_start}, "checkInTime": {"$ne": None}}},
+                {"$group": {"_id": None, "avgMs": {"$avg": {"$subtract": ["$checkOutTime", "$checkInTime"]}}}}
+            ]
+        }}
+    ]
+    facets = (await db.visitors.aggregate(pipeline).to_list(1))[0]
+
+    def count(name):
+        return facets[name][0]["n"] if facets[name] else 0
+
+    avg_minutes = facets["stay"][0]["avgMs"] / 60000 if facets["stay"] else 0
+    return {
+        "todayVisitors": count("today"),
+        "activeVisitors": count("active"),
+        "totalVisitorsMonth": count("month"),
+        "averageStayTime": format_stay(avg_minutes)
+    }
+
+
+async def load_building_stats(db: AsyncIOMotorDatabase, building: str, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    stats = await read_rollup_stats(db, building, now)
+    if stats is None:
+        stats = await compute_visitor_stats(db, building, now)
+    return stats
+
+
+async def get_building_stats(db: AsyncIOMotorDatabase, building: str) -> dict:
+    return await stats_cache.get_or_load(building, lambda: load_building_stats(db, building))
+
+
+async def rebuild_rollups(db: AsyncIOMotorDatabase, building: Optional[str] = None) -> int:
+    """Recompute rollups from the visitors collection, for one building or all.
+
+    Safe on a live system: each building's documents are overwritten with
+    upserted $set, never deleted and reinserted, and the building is marked
+    backfilled only once its counters are written. A visitor write landing
+    while its building is being rebuilt can be off by that one write.
+    """
+    days = {}
+
+    def bucket(building, day):
+        return days.setdefault(building, {}).setdefault(
+            day, {"checkIns": 0, "checkOuts": 0, "stayCount": 0, "staySeconds": 0, "active": 0}
+        )
+
+    query = {"$or": [{"building": building}, {"buildingId": building}]} if building else {}
+    cursor = db.visitors.find(
+        query,
+        {"_id": 0, "building": 1, "buildingId": 1, "status": 1, "checkInTime": 1, "checkOutTime": 1}
+    ).batch_size(1000)
+    async for visitor in cursor:
+        visitor_building = visitor.get("building") or visitor.get("buildingId")
+        if not visitor_building:
+            continue
+        bucket(visitor_building, TOTALS_DAY)
+        for rollup, deltas in _rollup_deltas(visitor_building, {}, visitor):
+            counters = bucket(rollup["building"], rollup["day"])
+            for field, value in deltas.items():
+                counters[field] += value
+
+    written = 0
+    for rollup_building, building_days in days.items():
+        now = datetime.utcnow()
+        await db[ROLLUP_COLLECTION].bulk_write([
+            UpdateOne(
+                {"building": rollup_building, "day": day},
+                {"$set": {**counters, **({"backfilledAt": now} if day == TOTALS_DAY else {})}},
+                upsert=True
+            )
+            for day, counters in building_days.items()
+        ], ordered=False)
+        # Days that no longer have visitors (e.g. deleted ones) must not keep old counts
+        await db[ROLLUP_COLLECTION].delete_many({"building": rollup_building, "day": {"$nin": list(building_days)}})
+        stats_cache.invalidate(rollup_building)
+        written += len(building_days)
+    return written
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Rebuild visitor stats rollups")
+    parser.add_argument("--building", help="only rebuild this building")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    written = await rebuild_rollups(db, args.building)
+    print(f"✅ Rebuilt {written} visitor stats rollup documents")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional
+import asyncio
+import functools
+import multiprocessing
+import os
+
+# Workers are started from a process that already runs Motor/pymongo threads;
+# forking it could copy a held lock into the child and deadlock, so process
+# pools start from a clean forkserver (spawn where that is unavailable).
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class BoundedPool:
+    """Runs blocking or CPU-heavy callables off the event loop.
+
+    At most ``max_workers + max_queue`` jobs are handed to the executor at any
+    time; further callers wait on a semaphore instead of piling work up.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, processes: bool = False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.processes = processes
+        self._executor = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(PROCESS_START_METHOD)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop, not the import-time one
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers + self.max_queue)
+        return self._semaphore
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(),
+                functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict:
+        running = min(self._in_flight, self.max_workers)
+        return {
+            "workers": self.max_workers,
+            "running": running,
+            # Jobs submitted to the executor but not yet picked up by a worker,
+            # plus callers still blocked on the semaphore
+            "queueDepth": self._in_flight - running + self._waiting,
+            "completed": self._completed
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# bcrypt releases the GIL, so a small thread pool is enough to keep
+# password hashing from stalling the event loop.
+hash_pool = BoundedPool(
+    "password-hash",
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 4)),
+    max_queue=int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+)
+
+# Image processing and rendering are pure CPU work in Python/Pillow, so they
+# get real processes instead of threads.
+cpu_pool = BoundedPool(
+    "cpu",
+    max_workers=int(os.environ.get('CPU_POOL_WORKERS', os.cpu_count() or 2)),
+    max_queue=int(os.environ.get('CPU_POOL_QUEUE', 128)),
+    processes=True
+)
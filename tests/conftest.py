@@ -0,0 +1,39 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Tests marked with the mongo_url fixture run against this server and are
+# skipped when nothing answers there
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_URL", TEST_MONGO_URL)
+os.environ.setdefault("DB_NAME", "acessaaqui_test")
+
+
+@pytest.fixture(scope="session")
+def mongo_url():
+    client = MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no mongod reachable at {TEST_MONGO_URL}")
+    finally:
+        client.close()
+    return TEST_MONGO_URL
+
+
+@pytest.fixture
+def db_name(mongo_url):
+    # A fresh database per test, dropped afterwards
+    name = f"acessaaqui_test_{uuid.uuid4().hex[:8]}"
+    yield name
+    client = MongoClient(mongo_url)
+    client.drop_database(name)
+    client.close()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+from auth import TokenCache, create_access_token, decode_token_cached, token_cache
+from dependencies import get_current_user
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2, ttl_seconds=60)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    assert cache.get("a") == {"sub": "a"}
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.get("c") == {"sub": "c"}
+    assert cache.stats()["size"] == 2
+
+
+def test_token_cache_expires_with_the_token():
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    cache.put("expired", {"sub": "x", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_token_cache_drops_entries_when_secret_changes(monkeypatch):
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    cache.put("a", {"sub": "a"})
+    monkeypatch.setattr(auth, "SECRET_KEY", "rotated")
+    assert cache.get("a") is None
+
+
+def test_decode_token_cached_hits_cache_and_rejects_garbage():
+    token_cache.clear()
+    token = create_access_token({"sub": "user-1", "role": "front_desk"}, timedelta(minutes=5))
+    hits = token_cache.hits
+
+    assert decode_token_cached(token)["sub"] == "user-1"
+    assert decode_token_cached(token)["sub"] == "user-1"
+    assert token_cache.hits == hits + 1
+    assert decode_token_cached("not-a-token") is None
+
+
+def current_user_for(claims: dict) -> dict:
+    token = create_access_token(claims, timedelta(minutes=5))
+    return asyncio.run(get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+
+def test_current_user_carries_the_legacy_building_key():
+    # server.py routes read current_user["building"]
+    assert current_user_for({"sub": "u1", "role": "front_desk", "buildingId": "b1"})["building"] == "b1"
+    assert current_user_for({"sub": "u2", "role": "front_desk", "building": "b2"})["building"] == "b2"
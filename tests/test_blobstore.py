@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import routes.visitors
+import server
+from blobstore import CHUNK_SIZE, BlobStore, GridFSBlobStore, LocalBlobStore
+from models import VisitorCreate
+from routes.visitors import download_visitor_image
+
+# Spans several chunks so reads really stream
+DATA = bytes(range(256)) * (CHUNK_SIZE // 256 * 2 + 10)
+
+
+def test_blob_store_is_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+def test_local_store_dedupes_and_streams(tmp_path):
+    store = LocalBlobStore(tmp_path)
+
+    async def scenario():
+        first = await store.put(DATA, "image/webp")
+        second = await store.put(DATA, "image/webp")
+        chunks = [chunk async for chunk in store.open_stream(first["key"])]
+        return first, second, chunks, await store.exists(first["key"]), await store.exists("0" * 64)
+
+    first, second, chunks, stored, missing = asyncio.run(scenario())
+    assert first == second == {"key": hashlib.sha256(DATA).hexdigest(), "contentType": "image/webp", "size": len(DATA)}
+    assert len(chunks) == 3 and b"".join(chunks) == DATA
+    assert stored and not missing
+    # One blob file, no temporary files left behind
+    assert [path.name for path in tmp_path.rglob("*") if path.is_file()] == [first["key"]]
+
+
+def test_local_store_missing_blob(tmp_path):
+    async def scenario():
+        return await LocalBlobStore(tmp_path).read("0" * 64)
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(scenario())
+
+
+def test_gridfs_store_dedupes_and_streams(mongo_url, db_name):
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        try:
+            db = client[db_name]
+            store = GridFSBlobStore(db)
+            first = await store.put(DATA, "image/webp")
+            second = await store.put(DATA, "image/webp")
+            chunks = [chunk async for chunk in store.open_stream(first["key"])]
+            files = await db["blobs.files"].count_documents({})
+            return first, second, chunks, files, await store.exists("0" * 64)
+        finally:
+            client.close()
+
+    first, second, chunks, files, missing = asyncio.run(scenario())
+    assert first == second
+    assert first["key"] == hashlib.sha256(DATA).hexdigest()
+    assert b"".join(chunks) == DATA
+    assert files == 1
+    assert not missing
+
+
+def test_missing_blob_download_is_a_404(mongo_url, db_name, tmp_path, monkeypatch):
+    monkeypatch.setattr(routes.visitors, "get_blob_store", lambda db: LocalBlobStore(tmp_path))
+    request = SimpleNamespace(headers={})
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        try:
+            db = client[db_name]
+            await db.visitors.insert_one({"id": "v1", "selfieRef": {"key": "0" * 64, "contentType": "image/webp"}})
+            with pytest.raises(HTTPException) as error:
+                await download_visitor_image("v1", "selfie", request, "full", {"role": "super_admin"}, db)
+            return error.value.status_code
+        finally:
+            client.close()
+
+    assert asyncio.run(scenario()) == 404
+
+
+def test_legacy_create_rejects_bad_image_with_400():
+    visitor = VisitorCreate(fullName="Joana Silva", hostName="Ana", companyId="c1", buildingId="b1",
+                            selfie="not base64!")
+    user = {"user_id": "u1", "building": "b1"}
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.create_visitor(visitor, user, None))
+    assert error.value.status_code == 400
@@ -0,0 +1,71 @@
+import asyncio
+
+from cache import AsyncTTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache(ttl_seconds=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(calls)}
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(10)))
+        cached = await cache.get_or_load("k", loader)
+        return results, cached
+
+    results, cached = asyncio.run(scenario())
+    assert calls == [1]
+    assert all(result == {"value": 1} for result in results)
+    assert cached == {"value": 1}
+    assert cache.stats()["hits"] == 1 and cache.stats()["loads"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = AsyncTTLCache(ttl_seconds=0)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return [await cache.get_or_load("k", loader) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+
+
+def test_invalidate_during_load_discards_stale_value():
+    cache = AsyncTTLCache(ttl_seconds=60)
+    values = iter(["stale", "fresh"])
+
+    async def loader():
+        value = next(values)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario():
+        in_flight = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        # A write lands while the first load is still reading
+        cache.invalidate("k")
+        stale = await in_flight
+        return stale, await cache.get_or_load("k", loader)
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale == "stale"
+    assert fresh == "fresh"
+
+
+def test_max_entries_bounds_the_cache():
+    cache = AsyncTTLCache(ttl_seconds=60, max_entries=3)
+
+    async def scenario():
+        for key in range(10):
+            await cache.get_or_load(key, lambda key=key: asyncio.sleep(0, result=key))
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] <= 3
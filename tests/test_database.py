@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from pymongo import MongoClient, ReadPreference
+
+import database
+
+
+@pytest.fixture
+def routed(monkeypatch, mongo_url, db_name):
+    monkeypatch.setenv("MONGO_URL", mongo_url)
+    monkeypatch.setenv("DB_NAME", db_name)
+    yield
+    database.close()
+
+
+def test_read_policies_set_preference_and_staleness(monkeypatch):
+    monkeypatch.setattr(database, "MONGO_SECONDARY_MAX_STALENESS_SECONDS", 120)
+
+    async def scenario():
+        try:
+            primary = database.read_database("primary")
+            secondary = database.read_database("secondary")
+            # Routed handles are built once per policy and reused
+            assert database.read_database("secondary") is secondary
+            return primary.read_preference, secondary.read_preference
+        finally:
+            database.close()
+
+    primary, secondary = asyncio.run(scenario())
+    assert primary == ReadPreference.PRIMARY
+    assert secondary.mongos_mode == "secondaryPreferred"
+    assert secondary.max_staleness == 120
+    assert database._routed == {}
+
+
+def test_secondary_policy_reads_leave_the_primary(routed, mongo_url):
+    client = MongoClient(mongo_url)
+    try:
+        hello = client.admin.command("hello")
+    finally:
+        client.close()
+    if not hello.get("setName") or not hello.get("hosts", [])[1:]:
+        pytest.skip("read routing needs a replica set with at least one secondary")
+
+    routing = asyncio.run(database.check_read_routing())
+    assert routing == {"primary": "primary", "secondary": "secondary"}
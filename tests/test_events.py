@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import events
+from events import EventBus, event_type_for
+from routes.visitors import visitor_events
+
+
+def test_publish_filters_by_building_and_company():
+    bus = EventBus()
+    building = bus.subscribe(building_id="b1")
+    company = bus.subscribe(building_id="b1", company_id="c2")
+    everything = bus.subscribe()
+
+    bus.publish("created", {"id": "v1", "buildingId": "b1", "companyId": "c1", "selfie": "base64"})
+
+    assert building.queue.qsize() == 1
+    assert company.queue.qsize() == 0
+    frame = everything.queue.get_nowait()
+    assert frame.startswith("event: created\ndata: ")
+    payload = json.loads(frame.split("data: ", 1)[1])
+    assert payload["id"] == "v1" and "selfie" not in payload
+
+
+def test_slow_subscriber_loses_oldest_events(monkeypatch):
+    monkeypatch.setattr(events, "SUBSCRIBER_QUEUE_SIZE", 2)
+    bus = EventBus()
+    slow = bus.subscribe()
+    for number in range(5):
+        bus.publish("created", {"id": f"v{number}"})
+
+    kept = [json.loads(slow.queue.get_nowait().split("data: ", 1)[1])["id"] for _ in range(2)]
+    assert kept == ["v3", "v4"]
+    assert bus.stats() == {"subscribers": 1, "published": 5, "dropped": 3}
+
+
+def test_event_type_for_status_changes():
+    assert event_type_for({}, {"status": "pending"}) == "created"
+    assert event_type_for({"status": "pending"}, {"status": "approved"}) == "approved"
+    assert event_type_for({"status": "checked-in"}, {"status": "checked_out"}) == "checked-out"
+    assert event_type_for({"status": "pending"}, {"status": "pending", "notes": "x"}) == "updated"
+
+
+def subscribe_as(user: dict, building_id=None, company_id=None):
+    async def scenario():
+        known = set(events.event_bus._subscriptions)
+        await visitor_events(building_id, company_id, user)
+        subscription, = set(events.event_bus._subscriptions) - known
+        events.event_bus.unsubscribe(subscription)
+        return subscription.building_id, subscription.company_id
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("user", [
+    {"role": "guest"}, {"role": "front_desk"}, {"role": "building_admin"}, {"role": "company_receptionist"}
+])
+def test_event_stream_refuses_users_without_a_scope(user):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(visitor_events(None, None, user))
+    assert error.value.status_code == 403
+
+
+def test_event_stream_ignores_query_scope_for_scoped_users():
+    front_desk = {"role": "front_desk", "buildingId": "b1"}
+    receptionist = {"role": "company_receptionist", "buildingId": "b1", "companyId": "c1"}
+    assert subscribe_as(front_desk, "b2", "c9") == ("b1", None)
+    assert subscribe_as(receptionist, "b2", "c9") == (None, "c1")
+    assert subscribe_as({"role": "super_admin"}, "b2", "c9") == ("b2", "c9")
@@ -0,0 +1,13 @@
+import random
+from datetime import datetime
+
+from generate_data import generate_visitors
+
+
+def test_generated_visitors_carry_both_building_fields():
+    companies = [{"id": "c1", "buildingId": "b1"}, {"id": "c2", "buildingId": "b2"}]
+    visitors = list(generate_visitors(random.Random(1), companies, [1, 1], 50, 30, datetime(2024, 5, 15, 12)))
+
+    assert len(visitors) == 50
+    assert all(visitor["building"] == visitor["buildingId"] for visitor in visitors)
+    assert {visitor["buildingId"] for visitor in visitors} == {"b1", "b2"}
@@ -0,0 +1,38 @@
+import io
+
+import pytest
+from PIL import Image
+
+from images import process_image
+
+EXIF_ORIENTATION = 0x0112
+
+
+def jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_process_image_bounds_and_orients():
+    # Stored sideways with "rotate 90°" in EXIF, like a portrait phone photo
+    master, thumbnail, content_type = process_image(jpeg(4000, 3000, orientation=6), 1600, 320, "JPEG", 80, 70)
+
+    assert content_type == "image/jpeg"
+    with Image.open(io.BytesIO(master)) as image:
+        assert image.size == (1200, 1600)
+    with Image.open(io.BytesIO(thumbnail)) as image:
+        assert image.size == (240, 320)
+
+
+def test_process_image_never_upscales():
+    master, _, _ = process_image(jpeg(200, 100), 1600, 320, "JPEG", 80, 70)
+    with Image.open(io.BytesIO(master)) as image:
+        assert image.size == (200, 100)
+
+
+def test_process_image_rejects_garbage():
+    with pytest.raises(OSError):
+        process_image(b"not an image", 1600, 320, "WEBP", 80, 70)
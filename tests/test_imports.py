@@ -0,0 +1,97 @@
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from openpyxl import Workbook
+
+from imports import detect_format, import_visitors, iter_row_chunks
+
+ROWS = [
+    {"fullName": "Ana Souza", "hostName": "Bruno", "companyId": "c1", "buildingId": "b1"},
+    {"fullName": "Caio Lima", "hostName": "Bruno", "companyId": "c1", "buildingId": "b1", "companions": "2"},
+]
+
+
+def xlsx(rows: list) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    header = list(rows[0])
+    sheet.append(header + ["companions"])
+    for row in rows:
+        sheet.append([row.get(column) for column in header] + [row.get("companions")])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_detect_format():
+    assert detect_format("visitors.XLSX", "") == "xlsx"
+    assert detect_format("upload", "application/x-ndjson; charset=utf-8") == "ndjson"
+    assert detect_format("visitors.pdf", "application/pdf") == ""
+
+
+@pytest.mark.parametrize("fmt, file", [
+    ("csv", io.BytesIO(b"fullName,hostName,companyId,buildingId,companions\n"
+                       b"Ana Souza,Bruno,c1,b1,\n Caio Lima ,Bruno,c1,b1,2\n")),
+    ("json", io.BytesIO(json.dumps({"visitors": ROWS}).encode())),
+    ("ndjson", io.BytesIO("\n".join(json.dumps(row) for row in ROWS).encode())),
+    ("xlsx", xlsx(ROWS)),
+])
+def test_iter_row_chunks_reads_every_format(fmt, file):
+    chunks = list(iter_row_chunks(file, fmt, chunk_size=1))
+    assert len(chunks) == 2
+    first, second = chunks[0][0], chunks[1][0]
+    # Empty cells are dropped so model defaults apply; strings are trimmed
+    assert "companions" not in first
+    assert second["fullName"] == "Caio Lima"
+    assert str(second["companions"]) == "2"
+
+
+def test_corrupt_xlsx_is_a_value_error():
+    with pytest.raises(ValueError):
+        list(iter_row_chunks(io.BytesIO(b"PK\x03\x04 definitely not a workbook"), "xlsx"))
+    with pytest.raises(ValueError):
+        list(iter_row_chunks(io.BytesIO(b"plain text"), "xlsx"))
+
+
+class FakeVisitors:
+    def __init__(self):
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.documents.extend(documents)
+        return SimpleNamespace(inserted_ids=[document["fullName"] for document in documents])
+
+
+def test_scope_overrides_win_over_file_columns():
+    db = SimpleNamespace(visitors=FakeVisitors())
+    rows = "\n".join(json.dumps({**row, "buildingId": "someone-elses"}) for row in ROWS)
+
+    async def build_document(visitor_data):
+        return visitor_data.dict()
+
+    result = asyncio.run(import_visitors(
+        db, io.BytesIO(rows.encode()), "ndjson", {"companyId": "c9"}, build_document, {"buildingId": "b1"}
+    ))
+
+    assert result["inserted"] == 2 and result["failed"] == 0
+    assert {document["buildingId"] for document in db.visitors.documents} == {"b1"}
+    # Defaults only fill gaps, the file's own companyId is kept
+    assert {document["companyId"] for document in db.visitors.documents} == {"c1"}
+
+
+def test_invalid_rows_are_reported_not_raised():
+    db = SimpleNamespace(visitors=FakeVisitors())
+    rows = json.dumps([{"fullName": "Sem Anfitrião"}, ROWS[0]]).encode()
+
+    async def build_document(visitor_data):
+        if visitor_data.companyId != "c1":
+            raise ValueError("companyId is not a company of this building")
+        return visitor_data.dict()
+
+    result = asyncio.run(import_visitors(db, io.BytesIO(rows), "json", {}, build_document))
+    assert result["inserted"] == 1
+    assert result["failed"] == 1 and result["errors"][0]["row"] == 1
@@ -0,0 +1,36 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import _has_collscan, _spec, check_query_plans, ensure_indexes, report_index_drift
+
+
+def test_has_collscan_walks_nested_stages():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    assert not _has_collscan(plan)
+    plan = {"stage": "SORT_MERGE", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}
+    assert _has_collscan(plan)
+
+
+def test_spec_ignores_numeric_type_of_direction():
+    assert _spec({"a": 1.0, "b": -1}, None) == _spec([("a", 1), ("b", -1)], False)
+    assert _spec({"a": 1}, True) != _spec({"a": 1}, False)
+
+
+def test_hot_queries_never_collscan(mongo_url, db_name):
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[db_name]
+        try:
+            await db.visitors.insert_many([
+                {"id": f"v{i}", "buildingId": "b", "building": "b", "companyId": "c", "status": "pending",
+                 "searchTokens": ["joana"], "createdAt": i} for i in range(50)
+            ])
+            await ensure_indexes(db)
+            return await check_query_plans(db), await report_index_drift(db)
+        finally:
+            client.close()
+
+    failures, drift = asyncio.run(scenario())
+    assert failures == []
+    assert drift == {}
@@ -0,0 +1,73 @@
+import re
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import server
+from metrics import MetricsMiddleware, command_metrics, registry
+
+probe_app = FastAPI()
+
+
+@probe_app.get("/probe/{item}")
+async def probe(item: str):
+    # What the Mongo command listener reports for three 2 ms finds
+    for _ in range(3):
+        command_metrics.succeeded(SimpleNamespace(command_name="find", duration_micros=2000))
+    return {"item": item}
+
+
+probe_app.add_middleware(MetricsMiddleware)
+
+
+def metric(text: str, line_start: str) -> float:
+    values = [line.rsplit(" ", 1)[1] for line in text.splitlines() if line.startswith(line_start + " ")]
+    assert len(values) == 1, line_start
+    return float(values[0])
+
+
+def test_timing_headers_count_mongo_commands_of_the_request():
+    response = TestClient(probe_app).get("/probe/a")
+
+    assert response.status_code == 200
+    timing = re.fullmatch(r'app;dur=(\d+\.\d), db;dur=(\d+\.\d);desc="(\d+) commands"',
+                          response.headers["server-timing"])
+    assert timing is not None
+    assert timing.group(2) == "6.0" and timing.group(3) == "3"
+    assert float(response.headers["x-request-time"]) == float(timing.group(1))
+    assert response.headers["timing-allow-origin"] == "*"
+
+
+def test_render_exports_counters_and_histograms_per_route_template():
+    client = TestClient(probe_app)
+    before = registry.render()
+    finds_before = metric(before, 'mongo_commands_total{command="find"}') if 'command="find"' in before else 0
+    client.get("/probe/b")
+    client.get("/probe/c")
+    client.get("/nowhere")
+    text = registry.render()
+
+    route = 'method="GET",route="/probe/{item}"'
+    assert "# TYPE http_requests_total counter" in text
+    assert "# TYPE http_request_db_commands histogram" in text
+    assert metric(text, 'http_requests_total{method="GET",route="/probe/{item}",status="200"}') >= 2
+    assert metric(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+    # Three commands per request land in the "le=5" bucket, none at or below 2
+    count = metric(text, f"http_request_db_commands_count{{{route}}}")
+    assert metric(text, f'http_request_db_commands_bucket{{{route},le="2"}}') == 0
+    assert metric(text, f'http_request_db_commands_bucket{{{route},le="5"}}') == count
+    assert metric(text, f'http_request_db_commands_bucket{{{route},le="+Inf"}}') == count
+    assert metric(text, f"http_request_db_commands_sum{{{route}}}") == count * 3
+    assert metric(text, 'mongo_commands_total{command="find"}') == finds_before + 6
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    # No startup hooks run here, so no Mongo connection is needed
+    response = TestClient(server.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert "# TYPE cpu_pool_queue_depth gauge" in response.text
+    assert "server-timing" in response.headers
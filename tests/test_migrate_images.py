@@ -0,0 +1,47 @@
+import asyncio
+import base64
+import io
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from PIL import Image
+
+from blobstore import LocalBlobStore
+from migrate_images import migrate_visitor_images
+from workers import cpu_pool
+
+
+def png_data_url() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (10, 120, 200)).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_migration_moves_inline_images_and_reruns_cleanly(mongo_url, db_name, tmp_path):
+    store = LocalBlobStore(tmp_path)
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        try:
+            db = client[db_name]
+            await db.visitors.insert_many([
+                {"id": "v1", "selfie": png_data_url(), "documentImage": None},
+                {"id": "v2", "selfie": "not base64!", "documentImage": None},
+                {"id": "v3", "selfie": None, "documentImage": None},
+            ])
+            first = await migrate_visitor_images(db, store, batch_size=1)
+            second = await migrate_visitor_images(db, store, batch_size=1)
+            return first, second, await db.visitors.find_one({"id": "v1"}, {"_id": 0})
+        finally:
+            client.close()
+
+    try:
+        first, second, visitor = asyncio.run(scenario())
+    finally:
+        cpu_pool.shutdown()
+    assert first == (1, 1)
+    # Only the undecodable visitor is left, and it is not counted as migrated
+    assert second == (0, 1)
+    assert visitor["selfie"] is None
+    ref = visitor["selfieRef"]
+    assert (tmp_path / ref["key"][:2] / ref["key"][2:4] / ref["key"]).is_file()
+    assert ref["thumbnail"]["key"] != ref["key"]
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from pagination import decode_cursor, encode_cursor, fetch_page, keyset_filter
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor({"createdAt": created_at, "id": "v-1", "fullName": "ignored"})
+    assert decode_cursor(cursor) == (created_at, "v-1")
+
+
+@pytest.mark.parametrize("created_at", ["2024-05-01T12:30:15Z", None])
+def test_cursor_keeps_string_and_missing_created_at(created_at):
+    document = {"id": "v-1"} if created_at is None else {"createdAt": created_at, "id": "v-1"}
+    assert decode_cursor(encode_cursor(document)) == (created_at, "v-1")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", "WzFd", "WzEsICJ2Il0="])
+def test_bad_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_keyset_filter_continues_after_cursor():
+    created_at = datetime(2024, 5, 1)
+    cursor = encode_cursor({"createdAt": created_at, "id": "v-9"})
+    after = {"$or": [
+        {"createdAt": {"$lt": created_at}},
+        {"createdAt": created_at, "id": {"$lt": "v-9"}},
+        {"createdAt": {"$not": {"$type": "date"}}}
+    ]}
+    assert keyset_filter({}, cursor) == after
+    assert keyset_filter({"buildingId": "b"}, cursor) == {"$and": [{"buildingId": "b"}, after]}
+    assert keyset_filter({"buildingId": "b"}, None) == {"buildingId": "b"}
+
+
+def test_pages_cover_visitors_whatever_their_created_at(mongo_url, db_name):
+    visitors = [{"id": f"d{i}", "createdAt": datetime(2024, 5, i + 1)} for i in range(5)]
+    visitors += [{"id": f"s{i}", "createdAt": f"2024-06-0{i + 1}T10:00:00"} for i in range(3)]
+    visitors += [{"id": f"m{i}"} for i in range(3)]
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        try:
+            collection = client[db_name].visitors
+            await collection.insert_many([dict(visitor) for visitor in visitors])
+            seen, cursor = [], None
+            while True:
+                page, cursor = await fetch_page(collection, {}, {"_id": 0, "id": 1, "createdAt": 1}, 2, cursor)
+                seen += [document["id"] for document in page]
+                if cursor is None:
+                    return seen
+        finally:
+            client.close()
+
+    seen = asyncio.run(scenario())
+    assert seen == ["d4", "d3", "d2", "d1", "d0", "s2", "s1", "s0", "m2", "m1", "m0"]
@@ -0,0 +1,87 @@
+import asyncio
+
+from fastapi import Response
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from routes.companies import update_company
+from routes.visitors import update_visitor
+from server import checkout_visitor
+
+SUPER_ADMIN = {"role": "super_admin"}
+
+
+class CommandLog(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def commands_per_request(mongo_url, db_name, requests) -> list:
+    # Runs each request against a seeded database and returns the Mongo
+    # commands each one sent
+    log = CommandLog()
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url, event_listeners=[log])
+        db = client[db_name]
+        try:
+            await db.companies.insert_one({"id": "c1", "buildingId": "b1", "name": "Acme"})
+            await db.visitors.insert_one({"id": "v1", "buildingId": "b1", "building": "b1", "companyId": "c1",
+                                          "fullName": "Joana Silva", "hostName": "Ana", "status": "approved",
+                                          "version": 1})
+            sent = []
+            for request in requests:
+                log.commands.clear()
+                await request(db)
+                sent.append(list(log.commands))
+            return sent
+        finally:
+            client.close()
+
+    return asyncio.run(scenario())
+
+
+def put_visitor(visitor_data: dict):
+    return lambda db: update_visitor("v1", visitor_data, Response(), None, None, SUPER_ADMIN, db)
+
+
+def test_updates_are_one_round_trip(mongo_url, db_name):
+    sent = commands_per_request(mongo_url, db_name, [
+        lambda db: update_company("c1", {"name": "Acme Ltda"}, SUPER_ADMIN, db),
+        # Nothing new to write still answers with the document, in one command
+        lambda db: update_company("c1", {"name": "Acme Ltda"}, SUPER_ADMIN, db),
+    ])
+    assert sent == [["findAndModify"], ["findAndModify"]]
+
+
+def test_visitor_put_commands(mongo_url, db_name):
+    sent = commands_per_request(mongo_url, db_name, [
+        # Notes only: the write itself
+        put_visitor({"notes": "Badge 12"}),
+        # A check-in also moves the stats rollups, in one bulk write
+        put_visitor({"status": "checked-in", "checkInTime": "2026-10-18T09:00:00"}),
+        # A rename first reads the other search fields to rebuild the tokens
+        put_visitor({"fullName": "Joana Souza"}),
+    ])
+    assert sent == [["findAndModify"], ["findAndModify", "update"], ["find", "findAndModify"]]
+
+
+def test_legacy_checkout_goes_through_the_repository(mongo_url, db_name):
+    lobby = {"role": "front_desk", "building": "b1"}
+    sent = commands_per_request(mongo_url, db_name, [
+        put_visitor({"status": "checked-in", "checkInTime": "2026-10-18T09:00:00"}),
+        # The compare-and-set write plus the rollup update
+        lambda db: checkout_visitor("v1", lobby, db),
+        # Already checked out: the write misses and one read says why
+        lambda db: checkout_visitor("v1", lobby, db),
+    ])
+    assert sent[1:] == [["findAndModify", "update"], ["findAndModify", "find"]]
@@ -0,0 +1,37 @@
+from search import build_search_tokens, normalize, ranked_search_pipeline, search_filter, tokenize
+
+
+def test_tokenize_folds_accents_and_case():
+    assert normalize("João Ávila") == "joao avila"
+    assert tokenize("  Maria-José D'Ávila 2º ") == ["maria", "jose", "d", "avila", "2o"]
+
+
+def test_build_search_tokens_dedupes_across_fields():
+    visitor = {"fullName": "Ana Souza", "representingCompany": "Souza Ltda", "company": None}
+    assert build_search_tokens(visitor) == ["ana", "souza", "ltda"]
+
+
+def test_search_filter_is_anchored_and_never_a_user_pattern():
+    assert search_filter("Jo.*") == {"$and": [{"searchTokens": {"$regex": "^jo"}}]}
+    assert search_filter("ana souza") == {"$and": [
+        {"searchTokens": {"$regex": "^ana"}}, {"searchTokens": {"$regex": "^souza"}}
+    ]}
+    assert search_filter("(*)") == {}
+
+
+def test_pipeline_projects_before_sorting():
+    pipeline = ranked_search_pipeline({"buildingId": "b"}, "ana", 20, {"_id": 0, "id": 1, "fullName": 1})
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages.index("$project") < stages.index("$sort") < stages.index("$limit")
+
+    project = pipeline[stages.index("$project")]["$project"]
+    # Fields the sort needs survive an inclusion projection and are dropped after
+    assert project["_score"] == 1 and project["createdAt"] == 1
+    assert pipeline[-1] == {"$unset": ["_score", "createdAt"]}
+
+
+def test_pipeline_keeps_exclusion_projection_as_is():
+    projection = {"_id": 0, "documentImage": 0, "selfie": 0}
+    pipeline = ranked_search_pipeline({}, "ana", 20, projection)
+    assert {"$project": projection} in pipeline
+    assert pipeline[-1] == {"$unset": ["_score"]}
@@ -0,0 +1,48 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from configcache import config_cache
+from models import SystemSettings
+from routes.settings import (
+    DEFAULT_BUILDING_SETTINGS, DEFAULT_SETTINGS, get_settings, update_building_settings, update_settings
+)
+
+SUPER_ADMIN = {"role": "super_admin"}
+
+
+def test_building_settings_update_falls_back_to_defaults(mongo_url, db_name):
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[db_name]
+        try:
+            empty = await update_building_settings("b1", {}, SUPER_ADMIN, db)
+            saved = await update_building_settings("b2", {"selfieRequired": True}, SUPER_ADMIN, db)
+            return empty, saved
+        finally:
+            client.close()
+
+    empty, saved = asyncio.run(scenario())
+    assert empty == {"buildingId": "b1", **DEFAULT_BUILDING_SETTINGS}
+    assert saved == {**DEFAULT_BUILDING_SETTINGS, "buildingId": "b2", "selfieRequired": True}
+
+
+def test_system_settings_round_trip(mongo_url, db_name):
+    saved = SystemSettings(**{**DEFAULT_SETTINGS, "brandName": "Portaria"})
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[db_name]
+        config_cache.invalidate("settings")
+        try:
+            before = await get_settings(SUPER_ADMIN, db)
+            written = await update_settings(saved, SUPER_ADMIN, db)
+            return before, written, await get_settings(SUPER_ADMIN, db), await db.settings.count_documents({})
+        finally:
+            config_cache.invalidate("settings")
+            client.close()
+
+    before, written, after, documents = asyncio.run(scenario())
+    assert before == DEFAULT_SETTINGS
+    assert written == after == saved.dict()
+    assert documents == 1
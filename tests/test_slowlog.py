@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from slowlog import MAX_SHAPE_ITEMS, SlowQueryLog, query_shape
+
+
+def test_query_shape_hides_literals_and_keeps_structure():
+    first = {"find": "visitors", "filter": {"buildingId": "b1", "status": {"$in": ["pending", "approved"]}},
+             "limit": 20, "lsid": {"id": "x"}, "$db": "acessaaqui"}
+    second = {"find": "visitors", "filter": {"buildingId": "b2", "status": {"$in": ["exited"]}},
+              "limit": 50, "lsid": {"id": "y"}, "$db": "acessaaqui"}
+    assert query_shape(first) == query_shape(second) == {
+        "find": "?", "filter": {"buildingId": "?", "status": {"$in": ["?"]}}, "limit": "?"
+    }
+
+
+def test_query_shape_keeps_pipelines_and_caps_them():
+    pipeline = [{"$match": {"buildingId": "b"}}] + [{"$limit": i} for i in range(MAX_SHAPE_ITEMS + 5)]
+    shape = query_shape({"aggregate": "visitors", "pipeline": pipeline})
+    assert shape["pipeline"][0] == {"$match": {"buildingId": "?"}}
+    assert len(shape["pipeline"]) == MAX_SHAPE_ITEMS
+
+
+def test_query_shape_stops_at_depth():
+    nested = current = {}
+    for _ in range(20):
+        current["a"] = current = {}
+    depth = 0
+    shape = query_shape(nested)
+    while isinstance(shape, dict):
+        shape, depth = shape["a"], depth + 1
+    assert shape == "…"
+    assert depth == 11
+
+
+def test_slow_commands_are_recorded_without_document_bodies():
+    log = SlowQueryLog(threshold_ms=100, max_entries=10, explain=False)
+
+    def run(request_id, command, micros):
+        log.started(SimpleNamespace(request_id=request_id, connection_id=("h", 1), command=command))
+        log.succeeded(SimpleNamespace(request_id=request_id, connection_id=("h", 1), command_name=next(iter(command)),
+                                      database_name="acessaaqui", duration_micros=micros))
+
+    run(1, {"find": "visitors", "filter": {"id": "v1"}}, 5000)
+    run(2, {"insert": "visitors", "documents": [{"selfie": "x" * 1000}, {"selfie": "y"}]}, 250000)
+
+    assert log.recorded == 1
+    entry = log.recent()[0]
+    assert entry["command"] == "insert"
+    assert entry["collection"] == "visitors"
+    assert entry["route"] == "background"
+    assert entry["durationMs"] == 250.0
+    assert entry["shape"] == {"insert": "?", "documents": 2}
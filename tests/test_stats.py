@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import stats
+from stats import (
+    ROLLUP_COLLECTION, TOTALS_DAY, _rollup_deltas, compute_visitor_stats, read_rollup_stats, rebuild_rollups,
+    record_visitor_change
+)
+
+NOW = datetime(2024, 5, 15, 12, 0)
+
+
+def test_rollup_deltas_for_check_in_and_out():
+    checked_in = {"status": "checked-in", "checkInTime": NOW - timedelta(hours=1)}
+    assert _rollup_deltas("b", {"status": "pending"}, checked_in) == [
+        ({"building": "b", "day": TOTALS_DAY}, {"active": 1}),
+        ({"building": "b", "day": "2024-05-15"}, {"checkIns": 1}),
+    ]
+
+    # ISO strings written through the generic PUT are understood too
+    checked_out = {**checked_in, "status": "checked-out", "checkOutTime": NOW.isoformat()}
+    assert _rollup_deltas("b", checked_in, checked_out) == [
+        ({"building": "b", "day": TOTALS_DAY}, {"active": -1}),
+        ({"building": "b", "day": "2024-05-15"}, {"checkOuts": 1, "stayCount": 1, "staySeconds": 3600.0}),
+    ]
+
+
+def test_rollup_deltas_convert_offsets_to_utc():
+    # 23:30 in São Paulo is already the next day in UTC
+    checked_in = {"status": "checked-in", "checkInTime": "2024-05-15T23:30:00-03:00"}
+    assert _rollup_deltas("b", {"status": "pending"}, checked_in)[1] == (
+        {"building": "b", "day": "2024-05-16"}, {"checkIns": 1}
+    )
+    checked_out = {**checked_in, "status": "checked-out", "checkOutTime": "2024-05-16T03:00:00Z"}
+    assert _rollup_deltas("b", checked_in, checked_out)[1] == (
+        {"building": "b", "day": "2024-05-16"}, {"checkOuts": 1, "stayCount": 1, "staySeconds": 1800.0}
+    )
+
+
+def test_rollup_deltas_skip_writes_that_change_nothing():
+    assert _rollup_deltas("b", {"status": "pending"}, {"status": "approved"}) == []
+
+
+class FailingDatabase:
+    def __getitem__(self, name):
+        return self
+
+    async def bulk_write(self, *args, **kwargs):
+        raise RuntimeError("primary stepped down")
+
+    async def update_one(self, *args, **kwargs):
+        raise RuntimeError("primary stepped down")
+
+
+def test_record_visitor_change_never_fails_the_request(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(stats.stats_cache, "invalidate", invalidated.append)
+    asyncio.run(record_visitor_change(FailingDatabase(), "b", {}, {"status": "checked-in"}))
+    assert invalidated == ["b"]
+
+
+def test_rollups_are_only_read_after_backfill(mongo_url, db_name):
+    visitors = [
+        {"id": f"v{i}", "building": "b", "status": "checked-in" if i % 2 else "checked-out",
+         "checkInTime": NOW - timedelta(hours=i + 1),
+         "checkOutTime": None if i % 2 else NOW - timedelta(hours=i + 1) + timedelta(minutes=30)}
+        for i in range(10)
+    ]
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[db_name]
+        try:
+            await db.visitors.insert_many(visitors)
+            # A live write before the backfill must not make partial rollups authoritative
+            await record_visitor_change(db, "b", {"status": "approved"}, {"status": "checked-in", "checkInTime": NOW})
+            before = await read_rollup_stats(db, "b", NOW)
+
+            await rebuild_rollups(db, "b")
+            after = await read_rollup_stats(db, "b", NOW)
+            # Rebuilding again while live counters exist overwrites instead of failing
+            await record_visitor_change(db, "b", {"status": "approved"}, {"status": "checked-in", "checkInTime": NOW})
+            await rebuild_rollups(db)
+            again = await read_rollup_stats(db, "b", NOW)
+            documents = await db[ROLLUP_COLLECTION].count_documents({"building": "b"})
+            return before, after, again, documents
+        finally:
+            client.close()
+
+    before, after, again, documents = asyncio.run(scenario())
+    assert before is None
+    expected = {"todayVisitors": 10, "activeVisitors": 5, "totalVisitorsMonth": 10, "averageStayTime": "0h 30min"}
+    assert after == expected
+    assert again == expected
+    assert documents == 2
+
+
+def test_fallback_and_rollups_count_the_same_visitors(mongo_url, db_name):
+    # Legacy visitors carry building, router and generated ones only buildingId
+    visitors = [
+        {"id": f"v{i}", **({"building": "b"} if i % 2 else {"buildingId": "b"}), "status": "checked-in",
+         "checkInTime": NOW - timedelta(hours=i + 1), "checkOutTime": None}
+        for i in range(6)
+    ]
+
+    async def scenario():
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[db_name]
+        try:
+            await db.visitors.insert_many(visitors)
+            fallback = await compute_visitor_stats(db, "b", NOW)
+            await rebuild_rollups(db, "b")
+            return fallback, await read_rollup_stats(db, "b", NOW)
+        finally:
+            client.close()
+
+    fallback, rollups = asyncio.run(scenario())
+    assert fallback == rollups
+    assert fallback["todayVisitors"] == 6
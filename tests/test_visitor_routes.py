@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import routes.visitors
+from idempotency import IDEMPOTENCY_COLLECTION
+from models import QRBadgeBatch, VisitorCreate
+from routes.visitors import (
+    MAX_QR_BATCH, apply_visitor_update, create_qrcode_batch, create_visitor, import_visitor_file, visitor_scope
+)
+
+SUPER_ADMIN = {"role": "super_admin"}
+FRONT_DESK = {"role": "front_desk", "buildingId": "b1"}
+RECEPTIONIST = {"role": "company_receptionist", "buildingId": "b1", "companyId": "c1"}
+
+
+def status_of(coroutine) -> int:
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(coroutine)
+    return error.value.status_code
+
+
+def test_visitor_scope_by_role():
+    assert visitor_scope(SUPER_ADMIN) == {}
+    assert visitor_scope(FRONT_DESK) == {"buildingId": "b1"}
+    assert visitor_scope({"role": "building_admin", "buildingId": "b2"}) == {"buildingId": "b2"}
+    assert visitor_scope(RECEPTIONIST) == {"companyId": "c1"}
+
+
+@pytest.mark.parametrize("user", [{"role": "front_desk"}, {"role": "company_receptionist"}, {"role": "guest"}, {}])
+def test_visitor_scope_rejects_unscoped_users(user):
+    with pytest.raises(HTTPException) as error:
+        visitor_scope(user)
+    assert error.value.status_code == 403
+
+
+def test_qr_batch_caps_ids_before_querying():
+    batch = QRBadgeBatch(visitorIds=[f"v{i}" for i in range(MAX_QR_BATCH + 1)])
+    # No database is passed: the request must be refused before any query
+    assert status_of(create_qrcode_batch(batch, SUPER_ADMIN, None)) == 400
+
+
+def test_qr_batch_refuses_other_companies():
+    batch = QRBadgeBatch(companyId="c2")
+    assert status_of(create_qrcode_batch(batch, RECEPTIONIST, None)) == 403
+    assert status_of(create_qrcode_batch(QRBadgeBatch(visitorIds=["v1"]), {"role": "guest"}, None)) == 403
+
+
+def test_import_refuses_another_building_or_company():
+    upload = SimpleNamespace(filename="visitors.csv", content_type="text/csv")
+    admin = {"role": "building_admin", "buildingId": "b1"}
+    assert status_of(import_visitor_file(upload, "b2", None, admin, None)) == 403
+    assert status_of(import_visitor_file(upload, "b1", "c2", RECEPTIONIST, None)) == 403
+    assert status_of(import_visitor_file(upload, None, None, {"role": "building_admin"}, None)) == 403
+
+
+def run_with_db(mongo_url, db_name, scenario):
+    async def run():
+        client = AsyncIOMotorClient(mongo_url)
+        try:
+            return await scenario(client[db_name])
+        finally:
+            client.close()
+
+    return asyncio.run(run())
+
+
+def test_repeated_transition_still_applies_other_fields(mongo_url, db_name):
+    async def scenario(db):
+        await db.visitors.insert_one({"id": "v1", "buildingId": "b1", "companyId": "c1", "fullName": "Joana Silva",
+                                      "hostName": "Ana", "status": "approved", "version": 2})
+        # Status alone: a retry of a transition that already happened, nothing written
+        before, after = await apply_visitor_update(db, "v1", {"status": "approved"}, None)
+        assert before is None and after["version"] == 2
+        # Other fields still apply, against the current version
+        before, after = await apply_visitor_update(db, "v1", {"status": "approved", "hostName": "Bruno"}, None)
+        assert before["hostName"] == "Ana" and after["version"] == 3
+        stored = await db.visitors.find_one({"id": "v1"})
+        assert stored["hostName"] == "Bruno" and stored["version"] == 3
+        # A stale If-Match is a conflict even when the status matches
+        with pytest.raises(HTTPException) as error:
+            await apply_visitor_update(db, "v1", {"status": "approved"}, 2)
+        assert error.value.status_code == 409
+
+    run_with_db(mongo_url, db_name, scenario)
+
+
+def test_failed_side_effects_do_not_repeat_a_committed_create(mongo_url, db_name, monkeypatch):
+    visitor = VisitorCreate(fullName="Joana Silva", hostName="Ana", companyId="c1", buildingId="b1")
+
+    async def broken_notify(db, before, after):
+        raise RuntimeError("rollup down")
+
+    async def scenario(db):
+        monkeypatch.setattr(routes.visitors, "notify_visitor_change", broken_notify)
+        with pytest.raises(RuntimeError):
+            await create_visitor(visitor, Response(), "key-1", db)
+        record = await db[IDEMPOTENCY_COLLECTION].find_one({"_id": "POST /visitors:key-1"})
+        assert record["state"] == "done"
+
+        monkeypatch.undo()
+        response = Response()
+        replayed = await create_visitor(visitor, response, "key-1", db)
+        assert response.headers["Idempotent-Replayed"] == "true"
+        assert await db.visitors.count_documents({}) == 1
+        assert replayed["id"] == (await db.visitors.find_one({}))["id"]
+
+    run_with_db(mongo_url, db_name, scenario)
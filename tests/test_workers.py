@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+from workers import BoundedPool
+
+
+def test_bounded_pool_limits_concurrency_and_reports_queue():
+    pool = BoundedPool("test", max_workers=2, max_queue=1)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def job(seconds):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(seconds)
+        with lock:
+            running.pop()
+        return seconds
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(pool.run(job, 0.05)) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        stats = pool.stats()
+        results = await asyncio.gather(*tasks)
+        return stats, results
+
+    try:
+        stats, results = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert results == [0.05] * 6
+    assert max(peak) == 2
+    assert stats["running"] == 2
+    # One job handed to the executor plus three callers held at the semaphore
+    assert stats["queueDepth"] == 4
+    assert pool.stats()["completed"] == 6
+
+
+def test_bounded_pool_keeps_event_loop_responsive():
+    pool = BoundedPool("test", max_workers=1, max_queue=4)
+
+    async def scenario():
+        blocking = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        tick = time.perf_counter() - started
+        await blocking
+        return tick
+
+    try:
+        assert asyncio.run(scenario()) < 0.1
+    finally:
+        pool.shutdown()